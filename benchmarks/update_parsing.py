@@ -0,0 +1,78 @@
+"""Per-update parsing cost: JSON decoding of a long-poll batch plus typed access.
+
+Run from the repository root: python -m benchmarks.update_parsing
+"""
+import json
+import timeit
+
+from src.vk_bot_framework.types import VKUpdate
+from src.vk_bot_framework.utils import codec
+
+BATCH_SIZE = 100
+ROUNDS = 200
+
+UPDATE = {
+    "group_id": 1,
+    "type": "message_new",
+    "event_id": "d1d6a4b3c5e0f5e2b0f1a9b7c3d8e2f4a6b5c9d0",
+    "v": "5.131",
+    "object": {
+        "message": {
+            "date": 1700000000,
+            "from_id": 123456789,
+            "id": 4242,
+            "out": 0,
+            "attachments": [],
+            "conversation_message_id": 17,
+            "fwd_messages": [],
+            "important": False,
+            "is_hidden": False,
+            "payload": "{\"command\":\"start\"}",
+            "peer_id": 123456789,
+            "random_id": 0,
+            "text": "Start Profile Creation"
+        },
+        "client_info": {
+            "button_actions": ["text", "vkpay", "open_app", "location", "open_link", "callback"],
+            "keyboard": True,
+            "inline_keyboard": True,
+            "carousel": True,
+            "lang_id": 0
+        }
+    }
+}
+
+BODY = json.dumps({"ts": "100", "updates": [UPDATE] * BATCH_SIZE}).encode()
+
+
+def decode_stdlib():
+    return json.loads(BODY)["updates"]
+
+
+def decode_codec():
+    return codec.loads(BODY)["updates"]
+
+
+def parse(updates):
+    for raw in updates:
+        update = VKUpdate.from_dict(raw)
+        message = update.message
+        message.peer_id, message.from_id, message.text
+
+
+def report(name, func):
+    seconds = min(timeit.repeat(func, number=ROUNDS, repeat=5))
+    print(f"{name:<32} {seconds / ROUNDS / BATCH_SIZE * 1e6:8.2f} us/update")
+
+
+def main():
+    print(f"codec: {'orjson' if codec.orjson is not None else 'json'}")
+    report("decode (json)", decode_stdlib)
+    report("decode (codec)", decode_codec)
+    updates = decode_codec()
+    report("VKUpdate + message fields", lambda: parse(updates))
+    report("decode (codec) + parse", lambda: parse(decode_codec()))
+
+
+if __name__ == "__main__":
+    main()
@@ -37,7 +37,7 @@ router = Router()
 class UserTrackingMiddleware(BaseMiddleware):
     async def before_update(self, update: VKUpdate, data: dict):
         if update.type == "message_new":
-            user_id = update.object["message"]["from_id"]
+            user_id = update.message.from_id
             data["user_id"] = user_id
             print(f"Processing message from user {user_id}")
         return True
@@ -46,116 +46,112 @@ class UserTrackingMiddleware(BaseMiddleware):
         print(f"Finished processing update for user {data.get('user_id')}")
 
 
+# Static keyboards are serialized once, not for every message
+START_KEYBOARD = KeyboardBuilder(one_time=True).add_button("Start Profile Creation", color="primary").freeze()
+GENDER_KEYBOARD = (
+    KeyboardBuilder(one_time=True)
+    .add_button("Male", color="primary")
+    .add_button("Female", color="primary")
+    .freeze()
+)
+
+
 # Command handlers
 @router.message(TextFilter("/start"))
-async def cmd_start(update: VKUpdate, context: dict, fsm: FSMContext, user_id):
+async def cmd_start(update: VKUpdate, context: dict, fsm: FSMContext, client: VKClient, user_id):
     print(user_id)
-    peer_id = update.object["message"]["peer_id"]
-    # Create keyboard
-    kb = KeyboardBuilder(one_time=True)
-    kb.add_button("Start Profile Creation", color="primary")
+    peer_id = update.message.peer_id
 
-    async with VKClient(TOKEN, GROUP_ID) as client:
-        messages = MessagesMethods(client)
-        await messages.send(
-            peer_id=peer_id,
-            message="Welcome to the Profile Bot! Press the button to start creating your profile.",
-            keyboard=kb.get_keyboard()
-        )
+    messages = MessagesMethods(client)
+    await messages.send(
+        peer_id=peer_id,
+        message="Welcome to the Profile Bot! Press the button to start creating your profile.",
+        keyboard=START_KEYBOARD
+    )
 
 
 @router.message(TextFilter("Start Profile Creation"))
-async def start_profile(update: VKUpdate, context: dict, fsm: FSMContext):
-    peer_id = update.object["message"]["peer_id"]
+async def start_profile(update: VKUpdate, context: dict, fsm: FSMContext, client: VKClient):
+    peer_id = update.message.peer_id
 
     await fsm.set_state(ProfileStates.waiting_name)
 
-    async with VKClient(TOKEN, GROUP_ID) as client:
-        messages = MessagesMethods(client)
-        await messages.send(
-            peer_id=peer_id,
-            message="Let's create your profile! What's your name?"
-        )
+    messages = MessagesMethods(client)
+    await messages.send(
+        peer_id=peer_id,
+        message="Let's create your profile! What's your name?"
+    )
 
 
 @router.message(StateFilter(ProfileStates.waiting_name))
-async def process_name(update: VKUpdate, context: dict, fsm: FSMContext):
-    peer_id = update.object["message"]["peer_id"]
-    name = update.object["message"]["text"]
+async def process_name(update: VKUpdate, context: dict, fsm: FSMContext, client: VKClient):
+    peer_id = update.message.peer_id
+    name = update.message.text
 
-    await fsm.update_data(name=name)
+    await fsm.patch(name=name)
     await fsm.set_state(ProfileStates.waiting_age)
 
-    async with VKClient(TOKEN, GROUP_ID) as client:
-        messages = MessagesMethods(client)
-        await messages.send(
-            peer_id=peer_id,
-            message=f"Nice to meet you, {name}! How old are you?"
-        )
+    messages = MessagesMethods(client)
+    await messages.send(
+        peer_id=peer_id,
+        message=f"Nice to meet you, {name}! How old are you?"
+    )
 
 
 @router.message(StateFilter(ProfileStates.waiting_age))
-async def process_age(update: VKUpdate, context: dict, fsm: FSMContext):
-    peer_id = update.object["message"]["peer_id"]
-    age = update.object["message"]["text"]
+async def process_age(update: VKUpdate, context: dict, fsm: FSMContext, client: VKClient):
+    peer_id = update.message.peer_id
+    age = update.message.text
 
     if not age.isdigit():
-        async with VKClient(TOKEN, GROUP_ID) as client:
-            messages = MessagesMethods(client)
-            await messages.send(
-                peer_id=peer_id,
-                message="Please enter a valid age (numbers only)"
-            )
-        return
-
-    await fsm.update_data(age=int(age))
-    await fsm.set_state(ProfileStates.waiting_gender)
-
-    kb = KeyboardBuilder(one_time=True)
-    kb.add_button("Male", color="primary")
-    kb.add_button("Female", color="primary")
-
-    async with VKClient(TOKEN, GROUP_ID) as client:
         messages = MessagesMethods(client)
         await messages.send(
             peer_id=peer_id,
-            message="Please select your gender:",
-            keyboard=kb.get_keyboard()
+            message="Please enter a valid age (numbers only)"
         )
+        return
 
+    await fsm.patch(age=int(age))
+    await fsm.set_state(ProfileStates.waiting_gender)
 
-@router.message(StateFilter(ProfileStates.waiting_gender))
-async def process_gender(update: VKUpdate, context: dict, fsm: FSMContext):
-    peer_id = update.object["message"]["peer_id"]
-    gender = update.object["message"]["text"]
+    messages = MessagesMethods(client)
+    await messages.send(
+        peer_id=peer_id,
+        message="Please select your gender:",
+        keyboard=GENDER_KEYBOARD
+    )
 
-    if gender not in ["Male", "Female"]:
-        async with VKClient(TOKEN, GROUP_ID) as client:
-            messages = MessagesMethods(client)
-            await messages.send(
-                peer_id=peer_id,
-                message="Please select gender using the buttons"
-            )
-        return
 
-    await fsm.update_data(gender=gender)
-    await fsm.set_state(ProfileStates.waiting_interests)
+@router.message(StateFilter(ProfileStates.waiting_gender))
+async def process_gender(update: VKUpdate, context: dict, fsm: FSMContext, client: VKClient):
+    peer_id = update.message.peer_id
+    gender = update.message.text
 
-    async with VKClient(TOKEN, GROUP_ID) as client:
+    if gender not in ["Male", "Female"]:
         messages = MessagesMethods(client)
         await messages.send(
             peer_id=peer_id,
-            message="Great! Finally, tell me about your interests and hobbies."
+            message="Please select gender using the buttons"
         )
+        return
+
+    await fsm.patch(gender=gender)
+    await fsm.set_state(ProfileStates.waiting_interests)
+
+    messages = MessagesMethods(client)
+    await messages.send(
+        peer_id=peer_id,
+        message="Great! Finally, tell me about your interests and hobbies."
+    )
 
 
 router2 = Router()
 
 
 @router2.message(StateFilter(ProfileStates.waiting_interests))
-async def process_interests(update: VKUpdate, context: dict, fsm: FSMContext):
-    peer_id = update.object["message"]["peer_id"]
-    interests = update.object["message"]["text"]
+async def process_interests(update: VKUpdate, context: dict, fsm: FSMContext, client: VKClient):
+    peer_id = update.message.peer_id
+    interests = update.message.text
 
     # Get all profile data
     data = await fsm.get_data()
@@ -174,12 +170,11 @@ Interests: {data['interests']}
 
 User ID: {context['user_id']}"""
 
-    async with VKClient(TOKEN, GROUP_ID) as client:
-        messages = MessagesMethods(client)
-        await messages.send(
-            peer_id=peer_id,
-            message=profile
-        )
+    messages = MessagesMethods(client)
+    await messages.send(
+        peer_id=peer_id,
+        message=profile
+    )
 
 
 async def main():
@@ -1,5 +1,10 @@
+from .profiles import ProfileResolver
+from .rate_limiter import Priority, RateLimiter
 from .vk_client import VKClient
 
 __all__ = [
+    "Priority",
+    "ProfileResolver",
+    "RateLimiter",
     "VKClient",
 ]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..types import VKResponse
+from .rate_limiter import Priority
+
+PendingCall = Tuple[str, Dict[str, Any], int, asyncio.Future]
+
+
+def build_execute_code(calls: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """Generate VKScript that runs ``calls`` and returns their results as an array."""
+    parts = []
+    for method, params in calls:
+        args = {key: value for key, value in params.items() if value is not None}
+        parts.append(f"API.{method}({json.dumps(args, ensure_ascii=False)})")
+    return f"return [{','.join(parts)}];"
+
+
+class ExecuteBatcher:
+    """Packs concurrent API calls into ``execute`` requests.
+
+    Calls made within ``window`` seconds of each other are sent together, up to
+    ``max_calls`` (VK's limit is 25) per ``execute``. Every caller gets back its
+    own ``VKResponse``; calls that failed inside ``execute`` get the matching
+    entry of ``execute_errors`` as their error. A batch is sent with the most
+    urgent priority of the calls it contains.
+    """
+
+    MAX_CALLS = 25
+
+    def __init__(
+            self,
+            send: Callable[[str, Dict[str, Any], int], Awaitable[VKResponse]],
+            window: float = 0.01,
+            max_calls: int = MAX_CALLS
+    ):
+        if not 1 <= max_calls <= self.MAX_CALLS:
+            raise ValueError(f"max_calls must be between 1 and {self.MAX_CALLS}")
+        self._send = send
+        self.window = window
+        self.max_calls = max_calls
+        self._pending: List[PendingCall] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def call(self, method: str, params: Dict[str, Any], priority: int = Priority.NORMAL) -> VKResponse:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((method, params, priority, future))
+
+        if len(self._pending) >= self.max_calls:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush_pending)
+
+        return await future
+
+    async def flush(self) -> None:
+        """Send everything collected so far and wait for the in-flight batches."""
+        self._flush_pending()
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def _flush_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_calls]
+            del self._pending[:self.max_calls]
+            task = asyncio.create_task(self._execute(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, batch: List[PendingCall]) -> None:
+        try:
+            if len(batch) == 1:
+                method, params, priority, future = batch[0]
+                _set_result(future, await self._send(method, params, priority))
+                return
+
+            code = build_execute_code([(method, params) for method, params, _, _ in batch])
+            priority = min(priority for _, _, priority, _ in batch)
+            response = await self._send("execute", {"code": code}, priority)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if not response.ok:
+            for *_, future in batch:
+                _set_result(future, VKResponse({"error": response.error}))
+            return
+
+        results = response.response or []
+        errors = iter(response.raw_response.get("execute_errors", []))
+        for index, (method, _, _, future) in enumerate(batch):
+            result = results[index] if index < len(results) else False
+            if result is False:
+                error = next(errors, None) or {
+                    "error_code": 0,
+                    "error_msg": "Call failed inside execute",
+                    "method": method
+                }
+                _set_result(future, VKResponse({"error": error}))
+            else:
+                _set_result(future, VKResponse({"response": result}))
+
+
+def _set_result(future: asyncio.Future, response: VKResponse) -> None:
+    if not future.done():
+        future.set_result(response)
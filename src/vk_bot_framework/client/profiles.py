@@ -0,0 +1,122 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from ..utils.lru import TTLCache
+from .rate_limiter import Priority
+
+if TYPE_CHECKING:
+    from .vk_client import VKClient
+
+Profile = Dict[str, Any]
+
+
+class ProfileResolver:
+    """Looks up user profiles with as few ``users.get`` calls as possible.
+
+    Lookups made within ``window`` seconds of each other are sent as one
+    ``users.get`` of up to 1000 ids, a user already being looked up is not
+    requested twice, and results are cached (LRU, ``cache_size`` profiles
+    for ``ttl`` seconds). Handlers get it injected as ``profiles``::
+
+        @router.message()
+        async def greet(update, context, fsm, profiles: ProfileResolver):
+            profile = await profiles.get(update.message.from_id)
+
+    Profiles of users VK did not return (deleted, or the call failed) are
+    ``None`` and are not cached.
+    """
+
+    MAX_IDS = 1000
+
+    def __init__(
+            self,
+            client: "VKClient",
+            fields: Sequence[str] = ("sex", "city", "screen_name"),
+            window: float = 0.01,
+            cache_size: int = 10000,
+            ttl: float = 300.0
+    ):
+        self.client = client
+        self.fields = ",".join(fields)
+        self.window = window
+        self.cache = TTLCache(cache_size, ttl)
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._pending: List[int] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get(self, user_id: int) -> Optional[Profile]:
+        profile = self.cache.get(user_id)
+        if profile is not None:
+            return profile
+        return await asyncio.shield(self._future(user_id))
+
+    async def get_many(self, user_ids: Iterable[int]) -> Dict[int, Optional[Profile]]:
+        profiles: Dict[int, Optional[Profile]] = {}
+        waiting = {}
+        for user_id in user_ids:
+            profile = self.cache.get(user_id)
+            if profile is not None:
+                profiles[user_id] = profile
+            elif user_id not in waiting:
+                waiting[user_id] = self._future(user_id)
+        if waiting:
+            results = await asyncio.shield(asyncio.gather(*waiting.values()))
+            profiles.update(zip(waiting, results))
+        return profiles
+
+    def _future(self, user_id: int) -> asyncio.Future:
+        future = self._futures.get(user_id)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = self._futures[user_id] = loop.create_future()
+        self._pending.append(user_id)
+        if len(self._pending) >= self.MAX_IDS:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_pending)
+        return future
+
+    def _flush_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.MAX_IDS]
+            del self._pending[:self.MAX_IDS]
+            task = asyncio.create_task(self._fetch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, user_ids: List[int]) -> None:
+        params = {"user_ids": ",".join(str(user_id) for user_id in user_ids), "fields": self.fields}
+        try:
+            response = await self.client._make_request("users.get", params, Priority.INTERACTIVE)
+        except Exception as e:
+            for user_id in user_ids:
+                future = self._futures.pop(user_id)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        found = {}
+        if response.ok:
+            for profile in response.response or []:
+                found[profile["id"]] = profile
+                self.cache.set(profile["id"], profile)
+        else:
+            print(f"users.get error: {response.error}")
+
+        for user_id in user_ids:
+            future = self._futures.pop(user_id)
+            if not future.done():
+                future.set_result(found.get(user_id))
+
+    async def flush(self) -> None:
+        """Send the lookups collected so far and wait for the ones in flight."""
+        self._flush_pending()
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
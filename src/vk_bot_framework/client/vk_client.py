@@ -1,43 +1,134 @@
-from typing import Optional, Dict, Any
+import asyncio
+import time
+from typing import Optional, Dict, Any, Callable
 
 import aiohttp
 
+from ..metrics import Metrics
 from ..types import VKResponse
+from ..utils import codec
+from .batcher import ExecuteBatcher
+from .profiles import ProfileResolver
+from .rate_limiter import Priority, RateLimiter
 
 
 class VKClient:
     API_VERSION = "5.131"
     API_BASE_URL = "https://api.vk.com/method/"
+    NOT_BATCHED_METHODS = frozenset({"execute", "groups.getLongPollServer"})
+    TOO_MANY_REQUESTS = 6
 
-    def __init__(self, access_token: str, group_id: int):
+    def __init__(
+            self,
+            access_token: str,
+            group_id: int,
+            connection_limit: int = 100,
+            connection_limit_per_host: int = 30,
+            dns_cache_ttl: int = 300,
+            keepalive_timeout: float = 60,
+            batch_window: Optional[float] = None,
+            requests_per_second: Optional[float] = None,
+            max_retries: int = 3,
+            retry_backoff: float = 0.5,
+            json_loads: Callable[[bytes], Any] = codec.loads,
+            metrics: Optional[Metrics] = None
+    ):
         self.access_token = access_token
         self.group_id = group_id
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        # Used for API responses and long-poll batches alike
+        self.json_loads = json_loads
+        self.metrics = metrics
         self._session: Optional[aiohttp.ClientSession] = None
+        # Opt-in: concurrent calls made within batch_window seconds go out as one execute
+        self._batcher: Optional[ExecuteBatcher] = None
+        if batch_window is not None:
+            self._batcher = ExecuteBatcher(self._send_request, window=batch_window)
+        # Opt-in: keep under VK's per-second limit instead of bursting into error 6
+        self._rate_limiter: Optional[RateLimiter] = None
+        if requests_per_second is not None:
+            self._rate_limiter = RateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._auth_params = {"access_token": access_token, "v": self.API_VERSION}
+        self._urls: Dict[str, str] = {}
+        # Batched and cached users.get, injected into handlers as "profiles"
+        self.profiles = ProfileResolver(self)
 
     async def __aenter__(self):
-        self._session = aiohttp.ClientSession()
+        self.session
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._session:
-            await self._session.close()
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The pooled session shared by API calls and long polling, created on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _make_request(
+            self,
+            method: str,
+            params: Dict[str, Any],
+            priority: int = Priority.NORMAL
+    ) -> VKResponse:
+        if self._batcher is not None and method not in self.NOT_BATCHED_METHODS:
+            return await self._batcher.call(method, params, priority)
+        return await self._send_request(method, params, priority)
+
+    async def _send_request(
+            self,
+            method: str,
+            params: Dict[str, Any],
+            priority: int = Priority.NORMAL
+    ) -> VKResponse:
+        # The caller's dict is left as it is, it may be reused or cached
+        form = {**params, **self._auth_params}
+        url = self._urls.get(method)
+        if url is None:
+            url = self._urls[method] = f"{self.API_BASE_URL}{method}"
 
-    async def _make_request(self, method: str, params: Dict[str, Any]) -> VKResponse:
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        attempt = 0
+        while True:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire(priority)
 
-        params.update({
-            "access_token": self.access_token,
-            "v": self.API_VERSION
-        })
+            started = time.perf_counter()
+            async with self.session.post(url, data=form) as response:
+                data = self.json_loads(await response.read())
+            result = VKResponse(data)
 
-        async with self._session.post(f"{self.API_BASE_URL}{method}", data=params) as response:
-            data = await response.json()
-            return VKResponse(data)
+            if self.metrics is not None:
+                self.metrics.api_duration.observe(time.perf_counter() - started, method)
+                if not result.ok:
+                    self.metrics.api_errors.inc(method, str(result.error.get("error_code")))
+
+            if result.ok or result.error.get("error_code") != self.TOO_MANY_REQUESTS or attempt >= self.max_retries:
+                return result
+
+            if self._rate_limiter is not None:
+                self._rate_limiter.penalize()
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            attempt += 1
 
     async def get_long_poll_server(self) -> VKResponse:
         return await self._make_request("groups.getLongPollServer", {"group_id": self.group_id})
 
     async def close(self):
+        await self.profiles.flush()
+        if self._batcher is not None:
+            await self._batcher.flush()
         if self._session and not self._session.closed:
-            await self._session.close()
\ No newline at end of file
+            await self._session.close()
@@ -0,0 +1,83 @@
+from collections.abc import MutableMapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+_MISSING = object()
+
+
+class UpdateContext(MutableMapping):
+    """Data of a single update, handed to middlewares and handlers as ``context``.
+
+    The FSM state, data and context live in slots, values set by middlewares go to a
+    dict private to this update. Keys not found there are looked up in the
+    application-wide ``shared`` mapping, which is read-only from here, so
+    concurrent updates never see each other's values.
+    """
+
+    __slots__ = ("state", "state_data", "fsm", "_values", "_shared")
+
+    _SLOT_KEYS = frozenset({"state", "state_data", "fsm"})
+
+    def __init__(
+            self,
+            shared: Mapping[str, Any] = _EMPTY,
+            state: Optional[str] = None,
+            state_data: Optional[Dict[str, Any]] = None,
+            fsm: Optional[Any] = None
+    ):
+        self.state = state
+        self.state_data = state_data if state_data is not None else {}
+        self.fsm = fsm
+        self._values: Optional[Dict[str, Any]] = None
+        self._shared = shared
+
+    def __repr__(self):
+        return f"UpdateContext({dict(self)!r})"
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._SLOT_KEYS:
+            return getattr(self, key)
+        if self._values is not None and key in self._values:
+            return self._values[key]
+        return self._shared[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._SLOT_KEYS:
+            setattr(self, key, value)
+        else:
+            if self._values is None:
+                self._values = {}
+            self._values[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if self._values is None or key not in self._values:
+            raise KeyError(key)
+        del self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        return (
+            key in self._SLOT_KEYS
+            or (self._values is not None and key in self._values)
+            or key in self._shared
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._values.get(key, _MISSING) if self._values is not None else _MISSING
+        if value is not _MISSING:
+            return value
+        if key in self._SLOT_KEYS:
+            return getattr(self, key)
+        return self._shared.get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ("state", "state_data", "fsm")
+        values = self._values or {}
+        yield from values
+        for key in self._shared:
+            if key not in values and key not in self._SLOT_KEYS:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -1,5 +1,7 @@
 from .dispatcher import Dispatcher
+from .sharding import ShardedDispatcher
 
 __all__ = [
     "Dispatcher",
+    "ShardedDispatcher",
 ]
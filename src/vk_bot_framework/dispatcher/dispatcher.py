@@ -1,58 +1,122 @@
 import asyncio
 import signal
+import time
 from asyncio import Event, Lock, CancelledError
 from contextlib import suppress
+from types import MappingProxyType
 from typing import Optional, List, Dict, Any
 
 import aiohttp
+from aiohttp import web
 
 from ..client import VKClient
+from ..context import UpdateContext
+from ..executors import HandlerExecutors
 from ..fsm import BaseStorage, MemoryStorage, FSMContext
-from ..middleware import MiddlewareManager
+from ..handler_table import HandlerTable
+from ..metrics import Metrics
+from ..middleware import Handler, MiddlewareManager
 from ..router import Router
 from ..types import VKUpdate
+from .scheduler import UpdateScheduler
+from .webhook import WebhookHandler
 
 
 class Dispatcher:
-    def __init__(self, client: VKClient, storage: Optional[BaseStorage] = None):
+    def __init__(
+            self,
+            client: VKClient,
+            storage: Optional[BaseStorage] = None,
+            metrics: Optional[Metrics] = None,
+            thread_workers: Optional[int] = None,
+            process_workers: Optional[int] = None
+    ):
         self.client = client
         self.storage = storage or MemoryStorage()
+        self.metrics = metrics
+        if metrics is not None and client.metrics is None:
+            client.metrics = metrics
         self.routers: List[Router] = []
+        # Pools for sync handlers and handlers registered with executor="thread"|"process"
+        self.executors = HandlerExecutors(thread_workers, process_workers, metrics)
         self.middleware_manager = MiddlewareManager()
+        self.middleware_manager.update_context(client=client, profiles=client.profiles)
+        self._shared_data = MappingProxyType(self.middleware_manager.context_data)
 
         self._session: Optional[aiohttp.ClientSession] = None
         self._running_lock = Lock()
         self._stop_signal: Optional[Event] = None
         self._stopped_signal: Optional[Event] = None
         self._polling_started = False
+        self._scheduler: Optional[UpdateScheduler] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._table: Optional[HandlerTable] = None
+        self._chain: Optional[Handler] = None
 
     def include_router(self, router: Router):
         self.routers.append(router)
+        # Rebuilt on startup or on the next update
+        self._table = None
+        self._chain = None
+
+    def build_table(self) -> HandlerTable:
+        """Compile the handlers of all included routers and the middleware chains.
+
+        Runs on startup (or lazily on the first update), middlewares set up
+        after that are not picked up until it is called again.
+        """
+        self._table = HandlerTable.from_routers(self.routers, self.metrics, self.executors)
+        self._chain = self.middleware_manager.build_chain(self._route, self.metrics)
+        return self._table
+
+    async def _route(self, update: VKUpdate, data: UpdateContext) -> bool:
+        handled = await self._table.dispatch(update, data, data.fsm)
+        if not handled and self.metrics is not None:
+            self.metrics.unmatched_updates.inc(update.type)
+        return handled
 
     async def _process_update(self, update: Dict[str, Any]):
         vk_update = VKUpdate.from_dict(update)
-        context_data = {"state": None, "state_data": {}}
+        if self.metrics is not None:
+            self.metrics.updates.inc(vk_update.type)
+        context_data = UpdateContext(self._shared_data)
 
         peer_id = None
         if vk_update.type == "message_new":
-            peer_id = vk_update.object["message"]["peer_id"]
-            context_data["state"] = await self.storage.get_state(peer_id)
-            context_data["state_data"] = await self.storage.get_data(peer_id)
+            peer_id = vk_update.message.peer_id
+            context_data.state, context_data.state_data = await self.storage.get_context(peer_id)
 
-        fsm = FSMContext(self.storage, peer_id) if peer_id else None
+        context_data.fsm = FSMContext(self.storage, peer_id) if peer_id else None
 
-        self.middleware_manager.update_context(**context_data)
-
-        if not await self.middleware_manager.trigger_before_update(vk_update, context_data):
-            return
+        if self._chain is None:
+            self.build_table()
+        await self._chain(vk_update, context_data)
 
-        for router in self.routers:
-            if await router.process_update(vk_update, context_data, fsm):
-                break
+    async def _feed_update(self, update: Dict[str, Any]):
+        if self._scheduler is not None:
+            await self._scheduler.submit(update)
+        else:
+            await self._process_update(update)
 
-        await self.middleware_manager.trigger_after_update(vk_update, context_data)
+    async def _consume_updates(self):
+        while True:
+            enqueued_at, update = await self._queue.get()
+            if self.metrics is not None:
+                self.metrics.queue_wait.observe(time.perf_counter() - enqueued_at)
+            try:
+                await self._feed_update(update)
+            except Exception as e:
+                print(f"Update processing error: {e}")
+            finally:
+                self._queue.task_done()
 
     async def _polling(self, polling_timeout: int = 25):
+        """Keep the long-poll connection busy and queue updates for the consumer.
+
+        ``ts`` and ``failed`` recovery are handled here only, so the next
+        request goes out as soon as the previous batch is queued.
+        """
         long_poll_data = await self.client.get_long_poll_server()
         server = long_poll_data.response["server"]
         key = long_poll_data.response["key"]
@@ -60,6 +124,7 @@ class Dispatcher:
 
         while not self._stop_signal.is_set():
             try:
+                started = time.perf_counter()
                 async with self._session.get(
                         f"{server}",
                         params={
@@ -70,9 +135,13 @@ class Dispatcher:
                         },
                         timeout=aiohttp.ClientTimeout(total=polling_timeout + 5)
                 ) as resp:
-                    data = await resp.json()
+                    data = self.client.json_loads(await resp.read())
+                    if self.metrics is not None:
+                        self.metrics.longpoll_duration.observe(time.perf_counter() - started)
 
                     if "failed" in data:
+                        if self.metrics is not None:
+                            self.metrics.longpoll_failures.inc(str(data["failed"]))
                         if data["failed"] == 1:
                             ts = data.get("ts", ts)
                             continue
@@ -86,7 +155,7 @@ class Dispatcher:
                             continue
 
                     for update in data.get("updates", []):
-                        await self._process_update(update)
+                        await self._queue.put((time.perf_counter(), update))
 
                     ts = data["ts"]
 
@@ -97,7 +166,39 @@ class Dispatcher:
                 print(f"Polling error: {e}")
                 await asyncio.sleep(5)
 
-    async def start_polling(self, polling_timeout: int = 25, handle_signals: bool = True):
+    async def _start_processing(self, max_concurrent_updates: Optional[int], queue_size: int):
+        self.build_table()
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        if max_concurrent_updates:
+            self._scheduler = UpdateScheduler(self._process_update, max_concurrent_updates, queue_size)
+        self._consumer_task = asyncio.create_task(self._consume_updates())
+
+    async def _stop_processing(self):
+        # Drain what was already received before shutting down
+        await self._queue.join()
+        self._consumer_task.cancel()
+        with suppress(CancelledError):
+            await self._consumer_task
+        self._consumer_task = None
+        if self._scheduler is not None:
+            await self._scheduler.wait_closed()
+            self._scheduler = None
+        await self.executors.close()
+
+    async def start_polling(
+            self,
+            polling_timeout: int = 25,
+            handle_signals: bool = True,
+            max_concurrent_updates: Optional[int] = None,
+            queue_size: int = 1000
+    ):
+        """Start long polling.
+
+        Updates are fetched ahead into a queue of ``queue_size`` updates, the
+        poller only waits when it is full. With ``max_concurrent_updates`` set,
+        updates of different peers are processed concurrently (updates of one
+        peer stay ordered).
+        """
         async with self._running_lock:
             self._stop_signal = Event()
             self._stopped_signal = Event()
@@ -105,6 +206,7 @@ class Dispatcher:
             self._stopped_signal.clear()
 
             await self._initialize_session()
+            await self._start_processing(max_concurrent_updates, queue_size)
 
             if handle_signals:
                 self._setup_signal_handlers()
@@ -132,11 +234,76 @@ class Dispatcher:
                 print("Polling was cancelled.")
             finally:
                 self._polling_started = False
+                await self._stop_processing()
                 await self._close_session()  # Ensure session is closed
                 await self.client.close()
+                await self.storage.close()
                 self._stopped_signal.set()
                 print("Polling stopped.")
 
+    def get_webhook_app(
+            self,
+            confirmation_code: str,
+            secret_key: Optional[str] = None,
+            path: str = "/",
+            max_concurrent_updates: Optional[int] = None,
+            queue_size: int = 1000
+    ) -> web.Application:
+        """Build an aiohttp application that receives updates from the Callback API.
+
+        Update processing starts and stops with the application, so it can be
+        served by ``start_webhook``, by any aiohttp runner or by a test client.
+        """
+        app = web.Application()
+        app.router.add_post(path, WebhookHandler(self, confirmation_code, secret_key))
+
+        async def on_startup(_: web.Application):
+            await self._start_processing(max_concurrent_updates, queue_size)
+
+        async def on_cleanup(_: web.Application):
+            await self._stop_processing()
+
+        app.on_startup.append(on_startup)
+        app.on_cleanup.append(on_cleanup)
+        return app
+
+    async def start_webhook(
+            self,
+            confirmation_code: str,
+            secret_key: Optional[str] = None,
+            host: str = "0.0.0.0",
+            port: int = 8080,
+            path: str = "/",
+            handle_signals: bool = True,
+            max_concurrent_updates: Optional[int] = None,
+            queue_size: int = 1000
+    ):
+        """Serve the Callback API until stopped, as an alternative to ``start_polling``."""
+        async with self._running_lock:
+            self._stop_signal = Event()
+            self._stopped_signal = Event()
+
+            app = self.get_webhook_app(confirmation_code, secret_key, path, max_concurrent_updates, queue_size)
+            runner = web.AppRunner(app)
+            await runner.setup()
+
+            if handle_signals:
+                self._setup_signal_handlers()
+
+            try:
+                site = web.TCPSite(runner, host, port)
+                await site.start()
+                print(f"Webhook server started on {host}:{port}{path}")
+                await self._stop_signal.wait()
+            except asyncio.CancelledError:
+                print("Webhook server was cancelled.")
+            finally:
+                await runner.cleanup()
+                await self.client.close()
+                await self.storage.close()
+                self._stopped_signal.set()
+                print("Webhook server stopped.")
+
     def _setup_signal_handlers(self):
         loop = asyncio.get_running_loop()
         try:
@@ -147,13 +314,12 @@ class Dispatcher:
             pass
 
     async def _initialize_session(self):
-        self._session = aiohttp.ClientSession()
+        # Long polling reuses the client's connection pool
+        self._session = self.client.session
 
     async def _close_session(self):
-        if self._session and not self._session.closed:
-            await self._session.close()
-        else:
-            print("Session is already closed.")
+        # The session is owned by the client and closed together with it
+        self._session = None
 
     def _signal_stop_polling(self, sig: signal.Signals) -> None:
         if not self._running_lock.locked():
@@ -0,0 +1,114 @@
+import asyncio
+import functools
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set, Tuple
+
+
+def get_peer_key(update: Dict[str, Any]) -> Optional[Hashable]:
+    """Return the key updates are serialized by, or None if order doesn't matter."""
+    obj = update.get("object") or {}
+    message = obj.get("message")
+    if isinstance(message, dict):
+        return message.get("peer_id")
+    return obj.get("peer_id") or obj.get("user_id") or obj.get("from_id")
+
+
+class UpdateScheduler:
+    """Runs updates concurrently while keeping updates of one peer in order.
+
+    Updates of a peer wait in that peer's FIFO and at most one of them is
+    running at a time, so a busy chat never occupies more than one of the
+    ``max_in_flight`` worker slots and other chats keep being served. Peers
+    with work ready take free slots in turn. ``submit`` blocks once
+    ``max_buffered`` updates are waiting or running, which holds off the
+    caller (the poller) until a worker finishes.
+    """
+
+    def __init__(
+            self,
+            handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+            max_in_flight: int = 100,
+            max_buffered: Optional[int] = None
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be positive")
+        self.handler = handler
+        self.max_in_flight = max_in_flight
+        self.max_buffered = max(max_buffered or max_in_flight * 10, max_in_flight)
+        self._buffer = asyncio.Semaphore(self.max_buffered)
+        # Peers with an update running or ready, mapped to their updates waiting behind it
+        self._peers: Dict[Hashable, Deque[Dict[str, Any]]] = {}
+        self._ready: Deque[Tuple[Optional[Hashable], Dict[str, Any]]] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def in_flight(self) -> int:
+        """Updates submitted and not finished yet, waiting or running."""
+        return self._pending
+
+    async def submit(self, update: Dict[str, Any]) -> None:
+        await self._buffer.acquire()
+        self._pending += 1
+        self._idle.clear()
+
+        key = get_peer_key(update)
+        if key is not None:
+            waiting = self._peers.get(key)
+            if waiting is not None:
+                waiting.append(update)
+                return
+            self._peers[key] = deque()
+        self._ready.append((key, update))
+        self._start_ready()
+
+    def _start_ready(self) -> None:
+        while self._ready and len(self._tasks) < self.max_in_flight:
+            key, update = self._ready.popleft()
+            task = asyncio.create_task(self._run(update))
+            self._tasks.add(task)
+            # A callback, not a finally: it also runs for tasks cancelled before they started
+            task.add_done_callback(functools.partial(self._finished, key))
+
+    async def _run(self, update: Dict[str, Any]):
+        try:
+            await self.handler(update)
+        except Exception as e:
+            print(f"Update processing error: {e}")
+
+    def _finished(self, key: Optional[Hashable], task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._buffer.release()
+        self._pending -= 1
+        if key is not None:
+            waiting = self._peers.get(key)
+            if waiting:
+                # Back of the line, so a busy peer doesn't starve the others
+                self._ready.append((key, waiting.popleft()))
+            elif waiting is not None:
+                del self._peers[key]
+        self._start_ready()
+        if not self._pending:
+            self._idle.set()
+
+    async def wait_closed(self) -> None:
+        """Wait until every submitted update has been processed."""
+        await self._idle.wait()
+
+    async def cancel(self) -> None:
+        """Drop waiting updates and cancel the running ones."""
+        dropped = len(self._ready) + sum(len(waiting) for waiting in self._peers.values())
+        self._ready.clear()
+        self._peers.clear()
+        for _ in range(dropped):
+            self._buffer.release()
+        self._pending -= dropped
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+        if not self._pending:
+            self._idle.set()
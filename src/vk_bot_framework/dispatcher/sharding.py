@@ -0,0 +1,184 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from contextlib import suppress
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..client import VKClient
+from .dispatcher import Dispatcher
+from .scheduler import get_peer_key
+
+
+async def _serve_shard(
+        dispatcher_factory: Callable[[], Dispatcher],
+        updates: multiprocessing.Queue,
+        max_concurrent_updates: Optional[int],
+        queue_size: int
+):
+    dispatcher = dispatcher_factory()
+    await dispatcher._start_processing(max_concurrent_updates, queue_size)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            update = await loop.run_in_executor(None, updates.get)
+            if update is None:
+                break
+            await dispatcher._queue.put((time.perf_counter(), update))
+    finally:
+        await dispatcher._stop_processing()
+        await dispatcher.client.close()
+        await dispatcher.storage.close()
+
+
+def _run_shard(
+        dispatcher_factory: Callable[[], Dispatcher],
+        updates: multiprocessing.Queue,
+        max_concurrent_updates: Optional[int],
+        queue_size: int
+):
+    # The supervisor decides when to stop and sends a sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_shard(dispatcher_factory, updates, max_concurrent_updates, queue_size))
+
+
+class _ShardQueue:
+    """Stands in for the dispatcher queue and routes updates to worker processes by peer."""
+
+    # How long a blocked put waits before checking whether the worker was replaced
+    PUT_TIMEOUT = 0.5
+
+    def __init__(self, queues: List[multiprocessing.Queue]):
+        self.queues = queues
+        self._round_robin = itertools.cycle(range(len(queues)))
+
+    def _shard(self, update: Dict[str, Any]) -> int:
+        key = get_peer_key(update)
+        return next(self._round_robin) if key is None else hash(key) % len(self.queues)
+
+    async def put(self, item: Tuple[float, Dict[str, Any]]) -> None:
+        _, update = item
+        index = self._shard(update)
+        loop = asyncio.get_running_loop()
+        while True:
+            # Looked up on every try: a restarted worker gets a new queue
+            shard = self.queues[index]
+            try:
+                shard.put_nowait(update)
+                return
+            except queue.Full:
+                pass
+            # Backpressure: the poller waits until the worker catches up
+            try:
+                await loop.run_in_executor(None, shard.put, update, True, self.PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+            except ValueError:
+                # Closed: retry only if it was because its worker was replaced
+                if self.queues[index] is shard:
+                    raise
+
+    def put_nowait(self, item: Tuple[float, Dict[str, Any]]) -> None:
+        _, update = item
+        try:
+            self.queues[self._shard(update)].put_nowait(update)
+        except queue.Full:
+            raise asyncio.QueueFull from None
+
+
+class ShardedDispatcher(Dispatcher):
+    """Receives updates in this process and processes them in ``workers`` processes.
+
+    Updates are sharded by ``peer_id``, so every chat is handled by one worker
+    and keeps its order and FSM storage locality. Each worker builds its own
+    dispatcher (routers, storage, client) with ``dispatcher_factory``, which
+    must be picklable, i.e. a module-level function. Crashed workers are
+    restarted with a fresh queue (updates the crashed one had not picked up
+    are lost); on shutdown workers finish the updates they already received.
+    Use ``start_polling`` or ``start_webhook`` as with a plain ``Dispatcher``.
+    """
+
+    def __init__(
+            self,
+            client: VKClient,
+            dispatcher_factory: Callable[[], Dispatcher],
+            workers: Optional[int] = None,
+            start_method: str = "spawn",
+            restart_delay: float = 1.0,
+            shutdown_timeout: float = 30.0
+    ):
+        super().__init__(client)
+        self.dispatcher_factory = dispatcher_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.restart_delay = restart_delay
+        self.shutdown_timeout = shutdown_timeout
+        self._mp = multiprocessing.get_context(start_method)
+        self._processes: List[multiprocessing.Process] = []
+        self._queues: List[multiprocessing.Queue] = []
+        self._worker_args: Tuple[Optional[int], int] = (None, 1000)
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        process = self._mp.Process(
+            target=_run_shard,
+            args=(self.dispatcher_factory, self._queues[index], *self._worker_args),
+            name=f"vk-bot-shard-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    async def _start_processing(self, max_concurrent_updates: Optional[int], queue_size: int):
+        self._worker_args = (max_concurrent_updates, queue_size)
+        self._queues = [self._mp.Queue(maxsize=queue_size) for _ in range(self.workers)]
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        self._queue = _ShardQueue(self._queues)
+        self._monitor_task = asyncio.create_task(self._monitor_workers())
+        print(f"Started {self.workers} worker processes")
+
+    async def _monitor_workers(self):
+        while True:
+            await asyncio.sleep(self.restart_delay)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    print(f"Worker {process.name} exited with code {process.exitcode}, restarting...")
+                    # A dead reader may hold the queue lock, so the new worker gets a fresh queue
+                    # (shared with _ShardQueue); updates left in the old one are dropped
+                    self._queues[index].close()
+                    self._queues[index] = self._mp.Queue(maxsize=self._worker_args[1])
+                    self._processes[index] = self._spawn(index)
+
+    async def _stop_processing(self):
+        self._monitor_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._monitor_task
+        self._monitor_task = None
+
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.shutdown_timeout
+        stopping = []
+        for updates, process in zip(self._queues, self._processes):
+            if not process.is_alive():
+                continue
+            try:
+                await loop.run_in_executor(None, updates.put, None, True, max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                print(f"Worker {process.name} did not take the stop signal in time, terminating...")
+                process.terminate()
+            stopping.append(process)
+
+        for process in stopping:
+            await loop.run_in_executor(None, process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"Worker {process.name} did not stop in time, terminating...")
+                process.terminate()
+                await loop.run_in_executor(None, process.join)
+
+        for updates in self._queues:
+            updates.close()
+        self._processes = []
+        self._queues = []
@@ -0,0 +1,45 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Optional
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from .dispatcher import Dispatcher
+
+
+class WebhookHandler:
+    """aiohttp handler for VK Callback API requests.
+
+    Answers the confirmation request, rejects requests with a wrong secret key
+    and queues everything else for the dispatcher, replying ``ok`` right away
+    so VK gets its answer within the timeout whatever the handlers take.
+    """
+
+    def __init__(self, dispatcher: "Dispatcher", confirmation_code: str, secret_key: Optional[str] = None):
+        self.dispatcher = dispatcher
+        self.confirmation_code = confirmation_code
+        self.secret_key = secret_key
+
+    async def __call__(self, request: web.Request) -> web.Response:
+        try:
+            data = self.dispatcher.client.json_loads(await request.read())
+        except ValueError:
+            return web.Response(status=400, text="bad request")
+
+        if not isinstance(data, dict):
+            return web.Response(status=400, text="bad request")
+
+        if self.secret_key is not None and data.get("secret") != self.secret_key:
+            return web.Response(status=403, text="forbidden")
+
+        if data.get("type") == "confirmation":
+            return web.Response(text=self.confirmation_code)
+
+        try:
+            self.dispatcher._queue.put_nowait((time.perf_counter(), data))
+        except asyncio.QueueFull:
+            # Anything but "ok" makes VK deliver the update again later
+            return web.Response(status=503, text="busy")
+
+        return web.Response(text="ok")
@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import inspect
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .metrics import Metrics
+from .types import VKUpdate
+
+EXECUTORS = ("thread", "process")
+
+
+def is_async_callable(callback: Callable) -> bool:
+    """Whether calling ``callback`` gives a coroutine, seen through ``functools.wraps`` and partials."""
+    while True:
+        if inspect.iscoroutinefunction(callback):
+            return True
+        if isinstance(callback, functools.partial):
+            callback = callback.func
+        elif hasattr(callback, "__wrapped__"):
+            callback = callback.__wrapped__
+        elif not inspect.isroutine(callback) and not inspect.isclass(callback) and hasattr(callback, "__call__"):
+            callback = callback.__call__
+        else:
+            return False
+
+
+async def _await(awaitable) -> Any:
+    return await awaitable
+
+
+def _run_callback(callback: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Tuple[float, Any]:
+    # Runs in a pool worker; async handlers get an event loop of their own there
+    started = time.time()
+    result = callback(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(_await(result))
+    return started, result
+
+
+def _run_in_process(
+        callback: Callable,
+        raw_update: Dict[str, Any],
+        context: Dict[str, Any],
+        kwargs: Dict[str, Any]
+) -> Tuple[float, Any]:
+    return _run_callback(callback, (VKUpdate.from_dict(raw_update), context, None), kwargs)
+
+
+class HandlerExecutors:
+    """Thread and process pools that run handlers off the event loop.
+
+    Handlers registered with ``executor="thread"`` (and plain ``def``
+    handlers) run in the thread pool with the usual arguments. Handlers
+    registered with ``executor="process"`` run in the process pool: they get
+    a copy of the update, a plain dict context with ``state``, ``state_data``
+    and the values they declared (which must be picklable) and ``None``
+    instead of ``FSMContext``. Return values and exceptions are passed back
+    to the caller in the event loop. Pools are created on first use.
+
+    ``async def`` handlers given an executor run on a new event loop in the
+    worker, so objects bound to the dispatcher's loop (``client``,
+    ``profiles``, ``fsm`` of network storages) can't be used there; keep
+    such handlers on the loop and offload only their CPU-bound part.
+    """
+
+    def __init__(
+            self,
+            thread_workers: Optional[int] = None,
+            process_workers: Optional[int] = None,
+            metrics: Optional[Metrics] = None
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.metrics = metrics
+        self._pools: Dict[str, Executor] = {}
+
+    def _pool(self, kind: str) -> Executor:
+        pool = self._pools.get(kind)
+        if pool is None:
+            if kind == "thread":
+                pool = ThreadPoolExecutor(self.thread_workers, thread_name_prefix="vk-bot-handler")
+            else:
+                pool = ProcessPoolExecutor(self.process_workers)
+            self._pools[kind] = pool
+        return pool
+
+    async def _submit(self, kind: str, func: Callable, *args: Any) -> Any:
+        metrics = self.metrics
+        submitted = time.time()
+        if metrics is not None:
+            metrics.executor_pending.inc(kind)
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(self._pool(kind), func, *args)
+        finally:
+            if metrics is not None:
+                metrics.executor_pending.dec(kind)
+        if metrics is not None:
+            metrics.executor_wait.observe(max(0.0, started - submitted), kind)
+        return result
+
+    async def run(
+            self,
+            kind: str,
+            callback: Callable,
+            update: VKUpdate,
+            context: Dict[str, Any],
+            fsm: Any,
+            kwargs: Dict[str, Any]
+    ) -> Any:
+        if kind == "thread":
+            return await self._submit(kind, _run_callback, callback, (update, context, fsm), kwargs)
+
+        plain_context = {"state": context.get("state"), "state_data": context.get("state_data"), **kwargs}
+        return await self._submit(kind, _run_in_process, callback, update.raw_update, plain_context, kwargs)
+
+    async def close(self) -> None:
+        """Wait for submitted handlers and shut the pools down."""
+        pools, self._pools = self._pools, {}
+        loop = asyncio.get_running_loop()
+        for pool in pools.values():
+            await loop.run_in_executor(None, pool.shutdown)
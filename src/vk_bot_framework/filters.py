@@ -1,41 +1,228 @@
+import re
 from abc import ABC, abstractmethod
-from typing import Union, Type
+from typing import Any, Dict, Pattern, Union, Type, Tuple, Optional, Sequence
 
 from .fsm import State, StatesGroup
 from .types.vk_update import VKUpdate
 
 
 class BaseFilter(ABC):
+    # Filters setting this implement check_sync and are called without awaiting
+    sync = False
+
     @abstractmethod
     async def check(self, update: VKUpdate, context: dict) -> bool:
         pass
 
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        raise NotImplementedError
+
+    def __and__(self, other: "BaseFilter") -> "AndFilter":
+        return AndFilter(self, other)
+
+    def __or__(self, other: "BaseFilter") -> "OrFilter":
+        return OrFilter(self, other)
+
+    def __invert__(self) -> "InvertFilter":
+        return InvertFilter(self)
+
+
+class SyncFilter(BaseFilter):
+    """Base for filters that decide without I/O."""
+    sync = True
+
+    @abstractmethod
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        pass
+
+    async def check(self, update: VKUpdate, context: dict) -> bool:
+        return self.check_sync(update, context)
+
+
+class _CompositeFilter(BaseFilter):
+    def __init__(self, *filters: BaseFilter):
+        flat = []
+        for filter_obj in filters:
+            # (A & B) & C is compiled as one AND over A, B and C
+            if type(filter_obj) is type(self):
+                flat.extend(filter_obj.filters)
+            else:
+                flat.append(filter_obj)
+        self.filters: Tuple[BaseFilter, ...] = tuple(flat)
+        # Cheap sync checks run before the ones that have to be awaited
+        self.sync_filters = tuple(f for f in flat if f.sync)
+        self.async_filters = tuple(f for f in flat if not f.sync)
+        self.sync = not self.async_filters
+
+
+class AndFilter(_CompositeFilter):
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        for filter_obj in self.sync_filters:
+            if not filter_obj.check_sync(update, context):
+                return False
+        return True
+
+    async def check(self, update: VKUpdate, context: dict) -> bool:
+        if not self.check_sync(update, context):
+            return False
+        for filter_obj in self.async_filters:
+            if not await filter_obj.check(update, context):
+                return False
+        return True
+
+
+class OrFilter(_CompositeFilter):
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        for filter_obj in self.sync_filters:
+            if filter_obj.check_sync(update, context):
+                return True
+        return False
+
+    async def check(self, update: VKUpdate, context: dict) -> bool:
+        if self.check_sync(update, context):
+            return True
+        for filter_obj in self.async_filters:
+            if await filter_obj.check(update, context):
+                return True
+        return False
+
+
+class InvertFilter(BaseFilter):
+    def __init__(self, filter_obj: BaseFilter):
+        self.filter = filter_obj
+        self.sync = filter_obj.sync
+
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        return not self.filter.check_sync(update, context)
+
+    async def check(self, update: VKUpdate, context: dict) -> bool:
+        if self.sync:
+            return not self.filter.check_sync(update, context)
+        return not await self.filter.check(update, context)
+
 
-class StateFilter(BaseFilter):
+def compile_filters(filters: Sequence[BaseFilter]) -> Optional[BaseFilter]:
+    """Combine handler filters into one filter, None when there is nothing to check."""
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return AndFilter(*filters)
+
+
+class StateFilter(SyncFilter):
     def __init__(self, state: Union[str, State, Type[StatesGroup], None]):
         self.state = state
 
-    async def check(self, update: VKUpdate, context: dict) -> bool:
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
         current_state = context.get("state")
         if self.state is None:
             return current_state is None
 
         if isinstance(self.state, type) and issubclass(self.state, StatesGroup):
-            return current_state and any(str(s) == current_state for s in self.state.states())
+            return bool(current_state) and any(str(s) == current_state for s in self.state.states())
 
         return str(self.state) == current_state
 
 
-class TextFilter(BaseFilter):
+class TextFilter(SyncFilter):
     def __init__(self, text: str, ignore_case: bool = True):
         self.text = text
         self.ignore_case = ignore_case
+        self._pattern = text.lower() if ignore_case else text
 
-    async def check(self, update: VKUpdate, context: dict) -> bool:
-        message_text = update.object["message"]["text"]
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        message = update.message
+        message_text = message.text if message is not None else ""
         if not message_text:
             return False
 
         if self.ignore_case:
-            return message_text.lower() == self.text.lower()
-        return message_text == self.text
+            return message_text.lower() == self._pattern
+        return message_text == self._pattern
+
+    @staticmethod
+    def make_key(text: str, ignore_case: bool) -> Tuple[str, str]:
+        return ("i", text.lower()) if ignore_case else ("s", text)
+
+    def index_keys(self) -> Tuple[Tuple[str, str], ...]:
+        """Keys under which handlers with this filter are indexed by exact text."""
+        if not self.text:
+            return ()
+        return (self.make_key(self.text, self.ignore_case),)
+
+
+class CommandFilter(SyncFilter):
+    """Matches ``/start`` and ``/start some args`` style messages.
+
+    The command is parsed once per update (``update.message.command``) and
+    handlers are indexed by command name, so adding command handlers does not
+    slow down dispatch.
+    """
+
+    def __init__(self, *commands: str, prefixes: str = "/", ignore_case: bool = True):
+        if not commands:
+            raise ValueError("At least one command is required")
+        self.prefixes = prefixes
+        self.ignore_case = ignore_case
+        self.commands = frozenset(c.lower() if ignore_case else c for c in commands)
+
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        message = update.message
+        command = message.command if message is not None else None
+        if command is None or command.prefix not in self.prefixes:
+            return False
+        return (command.name.lower() if self.ignore_case else command.name) in self.commands
+
+    @staticmethod
+    def make_key(prefix: str, name: str, ignore_case: bool) -> Tuple[str, str, str]:
+        return ("ci", prefix, name.lower()) if ignore_case else ("cs", prefix, name)
+
+    def index_keys(self) -> Tuple[Tuple[str, str, str], ...]:
+        """Keys under which handlers with this filter are indexed by command."""
+        return tuple(
+            self.make_key(prefix, command, self.ignore_case)
+            for prefix in self.prefixes
+            for command in self.commands
+        )
+
+
+class RegexFilter(SyncFilter):
+    """Matches messages whose text contains a match of ``pattern``.
+
+    Patterns of one dispatch table are also combined into a single
+    alternation that is tried first, so text matching none of them is
+    rejected with one search.
+    """
+
+    def __init__(self, pattern: Union[str, Pattern], flags: int = 0):
+        self.regex = re.compile(pattern, flags)
+
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        message = update.message
+        return message is not None and self.regex.search(message.text) is not None
+
+
+class PayloadFilter(SyncFilter):
+    """Matches keyboard button payloads.
+
+    Without arguments any payload matches, otherwise the payload must be an
+    object containing the given fields, e.g. ``PayloadFilter(command="start")``.
+    """
+
+    def __init__(self, payload: Optional[Dict[str, Any]] = None, **fields: Any):
+        self.fields = {**(payload or {}), **fields}
+
+    def check_sync(self, update: VKUpdate, context: dict) -> bool:
+        message = update.message
+        payload = message.payload if message is not None else None
+        if payload is None:
+            return False
+        if not self.fields:
+            return True
+        if not isinstance(payload, dict):
+            return False
+        for key, value in self.fields.items():
+            if key not in payload or payload[key] != value:
+                return False
+        return True
@@ -1,11 +1,15 @@
 from .state import State, StatesGroup
 from .storage import BaseStorage, MemoryStorage
 from .context import FSMContext
+from .redis_storage import RedisStorage
+from .sqlite_storage import SQLiteStorage
 
 __all__ = [
     "State",
     "StatesGroup",
     "BaseStorage",
     "MemoryStorage",
+    "RedisStorage",
+    "SQLiteStorage",
     "FSMContext"
 ]
\ No newline at end of file
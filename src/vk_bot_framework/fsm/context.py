@@ -27,13 +27,16 @@ class FSMContext:
         await self.storage.set_data(self.chat_id, data)
 
     async def update_data(self, **kwargs) -> Dict[str, Any]:
-        """Update state data with new values."""
-        data = await self.get_data()
-        data.update(kwargs)
-        await self.set_data(data)
-        return data
+        """Update state data with new values and return all of it.
+
+        Building the result costs O(whole data), use ``patch`` when it isn't needed.
+        """
+        return await self.storage.update_data(self.chat_id, kwargs)
+
+    async def patch(self, **kwargs) -> None:
+        """Set the given values in state data, only they are written."""
+        await self.storage.patch(self.chat_id, **kwargs)
 
     async def clear(self) -> None:
         """Clear state and data."""
-        await self.set_state(None)
-        await self.set_data({})
+        await self.storage.set_context(self.chat_id, None, {})
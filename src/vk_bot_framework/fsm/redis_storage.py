@@ -0,0 +1,115 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from .storage import BaseStorage
+
+
+def _decode(value: Any) -> Any:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisStorage(BaseStorage):
+    """FSM storage in Redis, shared between bot replicas and kept across restarts.
+
+    Works with ``redis.asyncio.Redis`` or any client implementing the same
+    pipeline commands (``get``, ``set``, ``delete``, ``hgetall``, ``hset``,
+    ``expire``), e.g. a local stand-in for tests. The state is a string key and
+    the data a hash with one JSON value per field. With ``ttl`` set, the records
+    of chats idle for that many seconds (no update read or wrote them) expire.
+    """
+
+    def __init__(self, redis: Any, prefix: str = "fsm", ttl: Optional[int] = None):
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "fsm", ttl: Optional[int] = None, **kwargs) -> "RedisStorage":
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise ImportError("RedisStorage.from_url requires the 'redis' package") from e
+        return cls(Redis.from_url(url, **kwargs), prefix=prefix, ttl=ttl)
+
+    def _state_key(self, chat_id: int) -> str:
+        return f"{self.prefix}:{chat_id}:state"
+
+    def _data_key(self, chat_id: int) -> str:
+        return f"{self.prefix}:{chat_id}:data"
+
+    def _expire(self, pipe: Any, chat_id: int) -> None:
+        if self.ttl is not None:
+            pipe.expire(self._state_key(chat_id), self.ttl)
+            pipe.expire(self._data_key(chat_id), self.ttl)
+
+    def _write_state(self, pipe: Any, chat_id: int, state: Optional[str]) -> None:
+        if state is None:
+            pipe.delete(self._state_key(chat_id))
+        else:
+            pipe.set(self._state_key(chat_id), state)
+
+    def _write_data(self, pipe: Any, chat_id: int, data: Dict[str, Any]) -> None:
+        pipe.delete(self._data_key(chat_id))
+        if data:
+            pipe.hset(self._data_key(chat_id), mapping={key: json.dumps(value) for key, value in data.items()})
+
+    @staticmethod
+    def _load_data(raw: Optional[Dict[Any, Any]]) -> Dict[str, Any]:
+        return {_decode(key): json.loads(value) for key, value in (raw or {}).items()}
+
+    async def get_state(self, chat_id: int) -> Optional[str]:
+        return _decode(await self.redis.get(self._state_key(chat_id)))
+
+    async def set_state(self, chat_id: int, state: Optional[str]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._write_state(pipe, chat_id, state)
+            self._expire(pipe, chat_id)
+            await pipe.execute()
+
+    async def get_data(self, chat_id: int) -> Dict[str, Any]:
+        return self._load_data(await self.redis.hgetall(self._data_key(chat_id)))
+
+    async def set_data(self, chat_id: int, data: Dict[str, Any]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._write_data(pipe, chat_id, data)
+            self._expire(pipe, chat_id)
+            await pipe.execute()
+
+    async def update_data(self, chat_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        # One MULTI round trip, but the whole hash is read back and decoded for the result
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if data:
+                pipe.hset(self._data_key(chat_id), mapping={key: json.dumps(value) for key, value in data.items()})
+            self._expire(pipe, chat_id)
+            pipe.hgetall(self._data_key(chat_id))
+            result = await pipe.execute()
+        return self._load_data(result[-1])
+
+    async def patch(self, chat_id: int, /, **fields: Any) -> None:
+        # Only the changed fields are sent, nothing is read back
+        if not fields:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._data_key(chat_id), mapping={key: json.dumps(value) for key, value in fields.items()})
+            self._expire(pipe, chat_id)
+            await pipe.execute()
+
+    async def get_context(self, chat_id: int) -> Tuple[Optional[str], Dict[str, Any]]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self._state_key(chat_id))
+            pipe.hgetall(self._data_key(chat_id))
+            # Reading counts as activity, a chat is idle only when nothing touches it
+            self._expire(pipe, chat_id)
+            state, data = (await pipe.execute())[:2]
+        return _decode(state), self._load_data(data)
+
+    async def set_context(self, chat_id: int, state: Optional[str], data: Dict[str, Any]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._write_state(pipe, chat_id, state)
+            self._write_data(pipe, chat_id, data)
+            self._expire(pipe, chat_id)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        close = getattr(self.redis, "aclose", None) or self.redis.close
+        await close()
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .storage import BaseStorage, ChatContext
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage in a local SQLite file that survives restarts.
+
+    Reads and writes go to an in-memory cache; changed chats are written to
+    disk in batches on a background thread every ``flush_interval`` seconds
+    (or as soon as ``max_pending`` chats are waiting), so at most that much
+    is lost on a crash. ``close`` writes everything that is left.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            flush_interval: float = 1.0,
+            max_pending: int = 1000,
+            cache_size: int = 10000
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[int, ChatContext]" = OrderedDict()
+        self._dirty: Set[int] = set()
+        # sqlite3 connections are bound to their thread, so all disk work runs on one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-storage")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS fsm (chat_id INTEGER PRIMARY KEY, state TEXT, data TEXT NOT NULL)"
+            )
+        return self._connection
+
+    def _read(self, chat_id: int) -> Optional[Tuple[Optional[str], str]]:
+        return self._connect().execute("SELECT state, data FROM fsm WHERE chat_id = ?", (chat_id,)).fetchone()
+
+    def _write(self, rows: List[Tuple[int, Optional[str], str]], deleted: List[int]) -> None:
+        connection = self._connect()
+        with connection:
+            if rows:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO fsm (chat_id, state, data) VALUES (?, ?, ?)", rows
+                )
+            if deleted:
+                connection.executemany("DELETE FROM fsm WHERE chat_id = ?", [(chat_id,) for chat_id in deleted])
+
+    def _close_connection(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def _load(self, chat_id: int) -> ChatContext:
+        record = self._cache.get(chat_id)
+        if record is None:
+            row = await self._run(self._read, chat_id)
+            # Another coroutine may have loaded and changed it meanwhile
+            record = self._cache.get(chat_id)
+            if record is None:
+                record = ChatContext(row[0], json.loads(row[1])) if row else ChatContext()
+                self._cache[chat_id] = record
+                self._evict(keep=chat_id)
+        self._cache.move_to_end(chat_id)
+        return record
+
+    def _evict(self, keep: int) -> None:
+        if len(self._cache) <= self.cache_size:
+            return
+        # Only chats already on disk can be dropped from the cache
+        for chat_id in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if chat_id != keep and chat_id not in self._dirty:
+                del self._cache[chat_id]
+
+    def _mark_dirty(self, chat_id: int) -> None:
+        self._dirty.add(chat_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_requested = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+        if len(self._dirty) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"SQLite storage flush error: {e}")
+
+    async def flush(self) -> None:
+        """Write all changed chats to disk."""
+        if not self._dirty:
+            return
+
+        rows = []
+        deleted = []
+        for chat_id in self._dirty:
+            record = self._cache[chat_id]
+            if record.empty:
+                deleted.append(chat_id)
+            else:
+                rows.append((chat_id, record.state, json.dumps(record.data)))
+        dirty, self._dirty = self._dirty, set()
+
+        try:
+            await self._run(self._write, rows, deleted)
+        except Exception:
+            # Keep them for the next attempt
+            self._dirty |= dirty
+            raise
+
+    async def get_state(self, chat_id: int) -> Optional[str]:
+        return (await self._load(chat_id)).state
+
+    async def set_state(self, chat_id: int, state: Optional[str]) -> None:
+        record = await self._load(chat_id)
+        record.state = state
+        self._mark_dirty(chat_id)
+
+    async def get_data(self, chat_id: int) -> Dict[str, Any]:
+        return dict((await self._load(chat_id)).data)
+
+    async def set_data(self, chat_id: int, data: Dict[str, Any]) -> None:
+        record = await self._load(chat_id)
+        record.data = dict(data)
+        self._mark_dirty(chat_id)
+
+    async def update_data(self, chat_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        record = await self._load(chat_id)
+        record.data.update(data)
+        self._mark_dirty(chat_id)
+        return dict(record.data)
+
+    async def patch(self, chat_id: int, /, **fields: Any) -> None:
+        if not fields:
+            return
+        record = await self._load(chat_id)
+        record.data.update(fields)
+        self._mark_dirty(chat_id)
+
+    async def get_context(self, chat_id: int) -> Tuple[Optional[str], Dict[str, Any]]:
+        record = await self._load(chat_id)
+        return record.state, dict(record.data)
+
+    async def set_context(self, chat_id: int, state: Optional[str], data: Dict[str, Any]) -> None:
+        record = await self._load(chat_id)
+        record.state = state
+        record.data = dict(data)
+        self._mark_dirty(chat_id)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await self._run(self._close_connection)
+        self._executor.shutdown(wait=True)
@@ -1,16 +1,26 @@
+import asyncio
+import sys
+import time
+import weakref
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 
 
-@dataclass
 class ChatContext:
-    state: Optional[str] = None
-    data: Dict[str, Any] = None
+    __slots__ = ("state", "data", "accessed_at")
 
-    def __post_init__(self):
-        if self.data is None:
-            self.data = {}
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.accessed_at = time.monotonic()
+
+    def __repr__(self):
+        return f"ChatContext(state={self.state!r}, data={self.data!r})"
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
 
 
 class BaseStorage(ABC):
@@ -30,23 +40,166 @@ class BaseStorage(ABC):
     async def set_data(self, chat_id: int, data: Dict[str, Any]) -> None:
         pass
 
+    async def get_context(self, chat_id: int) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Get state and data together, backends override it to use a single round trip."""
+        return await self.get_state(chat_id), await self.get_data(chat_id)
+
+    async def set_context(self, chat_id: int, state: Optional[str], data: Dict[str, Any]) -> None:
+        """Set state and data together, backends override it to write them in one go."""
+        await self.set_state(chat_id, state)
+        await self.set_data(chat_id, data)
+
+    async def update_data(self, chat_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge ``data`` into the stored data atomically and return the result.
+
+        Returning the merged dict costs O(whole data) in every backend, use
+        ``patch`` when the result isn't needed. The default is a
+        read-modify-write under the chat lock.
+        """
+        async with self.lock(chat_id):
+            current = dict(await self.get_data(chat_id))
+            current.update(data)
+            await self.set_data(chat_id, current)
+            return current
+
+    async def patch(self, chat_id: int, /, **fields: Any) -> None:
+        """Set ``fields`` in the stored data atomically.
+
+        Backends override it to write only the changed keys, the default
+        falls back to ``update_data``.
+        """
+        if fields:
+            await self.update_data(chat_id, fields)
+
+    def lock(self, chat_id: int) -> asyncio.Lock:
+        """Lock guarding read-modify-write sequences on one chat."""
+        locks = self.__dict__.get("_chat_locks")
+        if locks is None:
+            locks = self.__dict__["_chat_locks"] = weakref.WeakValueDictionary()
+        lock = locks.get(chat_id)
+        if lock is None:
+            lock = locks[chat_id] = asyncio.Lock()
+        return lock
+
+    async def close(self) -> None:
+        pass
+
 
 class MemoryStorage(BaseStorage):
-    def __init__(self):
-        self._data: Dict[int, ChatContext] = {}
+    """In-process FSM storage.
+
+    Records are kept in LRU order: with ``max_size`` set the least recently
+    used chat is evicted when the limit is exceeded, with ``ttl`` set chats
+    idle for that many seconds are dropped. Records of cleared chats are
+    removed right away. Reads and ``update_data`` return a copy of the data,
+    so callers never hold the stored dict; ``patch`` changes it in place
+    and costs only the changed keys.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self._data: "OrderedDict[int, ChatContext]" = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now: float) -> None:
+        # Records are ordered by last access, so the idle ones are at the front
+        while self._data:
+            chat_id, record = next(iter(self._data.items()))
+            if now - record.accessed_at < self.ttl:
+                break
+            del self._data[chat_id]
+            self.expirations += 1
+
+    def _get(self, chat_id: int) -> Optional[ChatContext]:
+        record = self._data.get(chat_id)
+        if record is None:
+            return None
+
+        now = time.monotonic()
+        if self.ttl is not None and now - record.accessed_at >= self.ttl:
+            del self._data[chat_id]
+            self.expirations += 1
+            return None
+
+        record.accessed_at = now
+        self._data.move_to_end(chat_id)
+        return record
+
+    def _get_or_create(self, chat_id: int) -> ChatContext:
+        record = self._get(chat_id)
+        if record is None:
+            if self.ttl is not None:
+                self._expire(time.monotonic())
+            record = self._data[chat_id] = ChatContext()
+            if self.max_size is not None:
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return record
+
+    def _drop_if_empty(self, chat_id: int, record: ChatContext) -> None:
+        if record.empty:
+            self._data.pop(chat_id, None)
 
     async def get_state(self, chat_id: int) -> Optional[str]:
-        return self._data.get(chat_id, ChatContext()).state
+        record = self._get(chat_id)
+        return record.state if record is not None else None
 
     async def set_state(self, chat_id: int, state: Optional[str]) -> None:
-        if chat_id not in self._data:
-            self._data[chat_id] = ChatContext()
-        self._data[chat_id].state = state
+        if state is None and self._get(chat_id) is None:
+            # Nothing to clear, creating a record could evict another chat
+            return
+        record = self._get_or_create(chat_id)
+        record.state = state
+        self._drop_if_empty(chat_id, record)
 
     async def get_data(self, chat_id: int) -> Dict[str, Any]:
-        return self._data.get(chat_id, ChatContext()).data
+        record = self._get(chat_id)
+        return dict(record.data) if record is not None else {}
 
     async def set_data(self, chat_id: int, data: Dict[str, Any]) -> None:
-        if chat_id not in self._data:
-            self._data[chat_id] = ChatContext()
-        self._data[chat_id].data = data
+        if not data and self._get(chat_id) is None:
+            return
+        record = self._get_or_create(chat_id)
+        record.data = dict(data)
+        self._drop_if_empty(chat_id, record)
+
+    async def update_data(self, chat_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        if not data:
+            return await self.get_data(chat_id)
+        record = self._get_or_create(chat_id)
+        record.data.update(data)
+        return dict(record.data)
+
+    async def patch(self, chat_id: int, /, **fields: Any) -> None:
+        if fields:
+            self._get_or_create(chat_id).data.update(fields)
+
+    async def get_context(self, chat_id: int) -> Tuple[Optional[str], Dict[str, Any]]:
+        record = self._get(chat_id)
+        if record is None:
+            return None, {}
+        return record.state, dict(record.data)
+
+    async def set_context(self, chat_id: int, state: Optional[str], data: Dict[str, Any]) -> None:
+        if state is None and not data:
+            self._data.pop(chat_id, None)
+            return
+        record = self._get_or_create(chat_id)
+        record.state = state
+        record.data = dict(data)
+
+    def stats(self) -> Dict[str, int]:
+        """Entry counts and a shallow estimate of the memory held by the records."""
+        memory = sys.getsizeof(self._data)
+        for record in self._data.values():
+            memory += sys.getsizeof(record) + sys.getsizeof(record.data)
+        return {
+            "entries": len(self._data),
+            "max_size": self.max_size or 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "memory_bytes": memory,
+        }
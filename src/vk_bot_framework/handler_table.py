@@ -0,0 +1,238 @@
+import heapq
+import inspect
+import re
+import time
+from operator import itemgetter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Pattern, Tuple
+
+from .executors import HandlerExecutors
+from .filters import AndFilter, BaseFilter, CommandFilter, RegexFilter, StateFilter, TextFilter, compile_filters
+from .fsm import FSMContext, StatesGroup
+from .metrics import Metrics
+from .middleware import Handler, build_chain
+from .types import VKUpdate
+
+ANY = object()
+
+Entry = Tuple[int, Dict[str, Any], Optional[BaseFilter], bool, Handler]
+
+_entry_order = itemgetter(0)
+
+_INDEXED_FILTERS = (TextFilter, CommandFilter)
+
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _filter_state_keys(state_filter: StateFilter) -> Optional[set]:
+    state = state_filter.state
+    if state is None:
+        return {None}
+    if isinstance(state, type) and issubclass(state, StatesGroup):
+        return {str(s) for s in state.states()}
+    return {str(state)}
+
+
+def _flatten(filters: Iterable[BaseFilter]) -> List[BaseFilter]:
+    flat = []
+    for filter_obj in filters:
+        if type(filter_obj) is AndFilter:
+            flat.extend(filter_obj.filters)
+        else:
+            flat.append(filter_obj)
+    return flat
+
+
+def _split_state(handler: Dict[str, Any], filters: List[BaseFilter]) -> Tuple[Iterable[Hashable], List[BaseFilter]]:
+    keys = None
+    if handler["state"] is not None:
+        keys = {str(handler["state"])}
+
+    rest = []
+    for filter_obj in filters:
+        if type(filter_obj) is StateFilter:
+            filter_keys = _filter_state_keys(filter_obj)
+            keys = filter_keys if keys is None else keys & filter_keys
+        else:
+            rest.append(filter_obj)
+
+    if keys is None:
+        return (ANY,), rest
+    return keys, rest
+
+
+def _split_message(filters: List[BaseFilter]) -> Tuple[Iterable[Hashable], List[BaseFilter]]:
+    for i, filter_obj in enumerate(filters):
+        if type(filter_obj) in _INDEXED_FILTERS:
+            keys = set(filter_obj.index_keys())
+            if keys:
+                return keys, filters[:i] + filters[i + 1:]
+    return (ANY,), filters
+
+
+def _combine_patterns(regexes: List[Pattern]) -> Optional[Pattern]:
+    """Join patterns into one alternation, None if one of them can't be embedded."""
+    parts = []
+    for regex in regexes:
+        if not isinstance(regex.pattern, str) or _BACKREFERENCE.search(regex.pattern):
+            return None
+        flags = regex.flags & ~re.UNICODE
+        letters = ""
+        for flag, letter in _INLINE_FLAGS:
+            if flags & flag:
+                letters += letter
+                flags &= ~flag
+        if flags:
+            return None
+        parts.append(f"(?{letters}:{regex.pattern})" if letters else f"(?:{regex.pattern})")
+
+    try:
+        return re.compile("|".join(parts))
+    except re.error:
+        return None
+
+
+def _compile_call(
+        handler: Dict[str, Any],
+        metrics: Optional[Metrics] = None,
+        executors: Optional[HandlerExecutors] = None
+) -> Handler:
+    """Pre-build the call of a handler wrapped in its router and handler middlewares."""
+    callback = handler["callback"]
+    injector = handler["injector"]
+    executor = handler["executor"]
+
+    if executor is None:
+        async def invoke(update: VKUpdate, context: dict) -> Any:
+            # Pass only the context values the handler declared (like user_id if available)
+            result = callback(update, context, context.get("fsm"), **injector(context))
+            # Wrappers that hide a coroutine function still return an awaitable
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+    else:
+        if executors is None:
+            raise RuntimeError(f"Handlers with executor={executor!r} have to be run by a Dispatcher")
+
+        async def invoke(update: VKUpdate, context: dict) -> Any:
+            return await executors.run(executor, callback, update, context, context.get("fsm"), injector(context))
+
+    if metrics is not None:
+        untimed = invoke
+        name = getattr(callback, "__qualname__", None) or repr(callback)
+
+        async def invoke(update: VKUpdate, context: dict) -> Any:
+            started = time.perf_counter()
+            try:
+                return await untimed(update, context)
+            finally:
+                metrics.handler_duration.observe(time.perf_counter() - started, name)
+
+    middlewares = list(handler["router"].middleware_manager.middlewares) + handler["middlewares"]
+    return build_chain(middlewares, invoke, metrics)
+
+
+def message_keys(update: VKUpdate) -> List[Hashable]:
+    message = update.message
+    if message is None or not message.text:
+        return [ANY]
+
+    text = message.text
+    keys = [TextFilter.make_key(text, True), TextFilter.make_key(text, False)]
+    command = message.command
+    if command is not None:
+        keys.append(CommandFilter.make_key(command.prefix, command.name, True))
+        keys.append(CommandFilter.make_key(command.prefix, command.name, False))
+    keys.append(ANY)
+    return keys
+
+
+class HandlerTable:
+    """Handlers of one or more routers compiled into a lookup table.
+
+    Handlers are bucketed by event type, by the FSM state they are bound to
+    and by the exact text of their ``TextFilter`` or the commands of their
+    ``CommandFilter``, so finding the candidates for an update takes a few
+    dict lookups instead of a scan over every handler. All ``RegexFilter``
+    patterns are combined into one alternation that rejects non-matching text
+    for every regex handler at once. Candidates keep their registration
+    order, the first one whose remaining filters (compiled into one, sync
+    checks first) pass handles the update.
+    """
+
+    def __init__(
+            self,
+            handlers: Iterable[Dict[str, Any]],
+            metrics: Optional[Metrics] = None,
+            executors: Optional[HandlerExecutors] = None
+    ):
+        self._buckets: Dict[str, Dict[Tuple[Hashable, Hashable], List[Entry]]] = {}
+        regexes = []
+
+        for index, handler in enumerate(handlers):
+            state_keys, filters = _split_state(handler, _flatten(handler["filters"]))
+            message_keys, filters = _split_message(filters)
+
+            handler_regexes = [f.regex for f in filters if type(f) is RegexFilter]
+            regexes.extend(handler_regexes)
+
+            buckets = self._buckets.setdefault(handler["event_type"], {})
+            entry = (index, handler, compile_filters(filters), bool(handler_regexes), _compile_call(handler, metrics, executors))
+            for state_key in state_keys:
+                for message_key in message_keys:
+                    buckets.setdefault((state_key, message_key), []).append(entry)
+
+        self._regex = _combine_patterns(regexes) if regexes else None
+
+    @classmethod
+    def from_routers(
+            cls,
+            routers: Iterable[Any],
+            metrics: Optional[Metrics] = None,
+            executors: Optional[HandlerExecutors] = None
+    ) -> "HandlerTable":
+        return cls((handler for router in routers for handler in router.handlers), metrics, executors)
+
+    def candidates(self, update: VKUpdate, state: Optional[str]) -> Iterable[Entry]:
+        buckets = self._buckets.get(update.type)
+        if not buckets:
+            return ()
+
+        keys = message_keys(update)
+        found = []
+        for state_key in (state, ANY):
+            for message_key in keys:
+                bucket = buckets.get((state_key, message_key))
+                if bucket:
+                    found.append(bucket)
+
+        if not found:
+            return ()
+        if len(found) == 1:
+            return found[0]
+        return heapq.merge(*found, key=_entry_order)
+
+    async def dispatch(self, update: VKUpdate, context: dict, fsm: Optional[FSMContext]) -> bool:
+        if fsm is not None:
+            context["fsm"] = fsm
+
+        regex_missed = None
+        for _, handler, filter_obj, regex_guarded, call in self.candidates(update, context.get("state")):
+            if regex_guarded and self._regex is not None:
+                if regex_missed is None:
+                    message = update.message
+                    regex_missed = message is None or self._regex.search(message.text) is None
+                if regex_missed:
+                    continue
+
+            if filter_obj is None:
+                should_handle = True
+            elif filter_obj.sync:
+                should_handle = filter_obj.check_sync(update, context)
+            else:
+                should_handle = await filter_obj.check(update, context)
+
+            if should_handle:
+                await call(update, context)
+                return True
+        return False
@@ -0,0 +1,13 @@
+from .api import VKAPI
+from .broadcast import Broadcast, BroadcastResult
+from .methods import MessagesMethods
+from .upload import Uploader, UploadError
+
+__all__ = [
+    "Broadcast",
+    "BroadcastResult",
+    "MessagesMethods",
+    "UploadError",
+    "Uploader",
+    "VKAPI",
+]
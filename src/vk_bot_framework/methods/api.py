@@ -0,0 +1,156 @@
+import asyncio
+import inspect
+import re
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ..client import VKClient
+from ..types import VKResponse
+from ..utils import codec
+from ..utils.lru import TTLCache
+from .schema import Ids, MethodSpec, Names, by_section
+
+Serializer = Callable[[Any], Any]
+
+_CAMEL = re.compile(r"(?<!^)(?=[A-Z])")
+
+
+def _serialize_list(value: Any) -> str:
+    if isinstance(value, (str, int)):
+        return str(value)
+    return ",".join(str(item) for item in value)
+
+
+def _serialize_json(value: Any) -> str:
+    return value if isinstance(value, str) else codec.dumps(value)
+
+
+_SERIALIZERS: Dict[Any, Serializer] = {
+    int: int,
+    float: float,
+    str: str,
+    bool: int,
+    dict: _serialize_json,
+    Ids: _serialize_list,
+    Names: _serialize_list,
+}
+
+
+def python_name(method: str) -> str:
+    """``messages.getById`` -> ``get_by_id``"""
+    return _CAMEL.sub("_", method.split(".", 1)[1]).lower()
+
+
+class _CompiledMethod:
+    """Serializers of one method resolved once, applied to every call."""
+
+    __slots__ = ("spec", "serializers", "required", "defaults")
+
+    def __init__(self, spec: MethodSpec):
+        self.spec = spec
+        self.serializers: Dict[str, Serializer] = {param.name: _SERIALIZERS[param.type] for param in spec.params}
+        self.required: Tuple[str, ...] = tuple(param.name for param in spec.params if param.required)
+        self.defaults: Dict[str, Any] = {
+            param.name: param.default for param in spec.params if param.default is not None
+        }
+
+    def serialize(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        params = dict(self.defaults)
+        serializers = self.serializers
+        for name, value in kwargs.items():
+            if value is None:
+                continue
+            serializer = serializers.get(name)
+            if serializer is None:
+                raise TypeError(f"{self.spec.name}() got an unexpected argument {name!r}")
+            params[name] = serializer(value)
+        for name in self.required:
+            if name not in params:
+                raise TypeError(f"{self.spec.name}() missing required argument {name!r}")
+        return params
+
+
+def _signature(spec: MethodSpec) -> inspect.Signature:
+    parameters = [inspect.Parameter("self", inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+    for param in sorted(spec.params, key=lambda p: not p.required):
+        parameters.append(inspect.Parameter(
+            param.name,
+            inspect.Parameter.KEYWORD_ONLY,
+            default=inspect.Parameter.empty if param.required else param.default,
+            annotation=param.type if param.required else Optional[param.type]
+        ))
+    parameters.append(inspect.Parameter(
+        "priority", inspect.Parameter.KEYWORD_ONLY, default=spec.priority, annotation=int
+    ))
+    return inspect.Signature(parameters, return_annotation=VKResponse)
+
+
+def _make_method(spec: MethodSpec) -> Callable:
+    compiled = _CompiledMethod(spec)
+
+    async def method(self, *, priority: Optional[int] = None, **kwargs: Any) -> VKResponse:
+        params = compiled.serialize(kwargs)
+        return await self._api.call(spec, params, spec.priority if priority is None else priority)
+
+    method.__name__ = python_name(spec.name)
+    method.__qualname__ = f"{spec.name.split('.', 1)[0].capitalize()}API.{method.__name__}"
+    method.__signature__ = _signature(spec)
+    method.__doc__ = f"{spec.doc}\n\nVK method ``{spec.name}``."
+    return method
+
+
+class _Section:
+    def __init__(self, api: "VKAPI"):
+        self._api = api
+
+
+def _make_section(name: str, specs: List[MethodSpec]) -> type:
+    namespace = {python_name(spec.name): _make_method(spec) for spec in specs}
+    namespace["__doc__"] = f"``{name}.*`` methods."
+    return type(f"{name.capitalize()}API", (_Section,), namespace)
+
+
+_SECTIONS: Dict[str, type] = {name: _make_section(name, specs) for name, specs in by_section().items()}
+
+
+class VKAPI:
+    """Keyword-argument wrappers for the methods described in ``methods.schema``.
+
+    ``api.users.get(user_ids=[1, 2], fields=["photo_100"])`` serializes the
+    arguments and sends them through the client. Responses of idempotent
+    reads (``cached`` in the schema) are kept for ``cache_ttl`` seconds, up
+    to ``cache_size`` of them, and identical reads that are in flight at the
+    same time share one request. Pass ``cache_size=0`` to turn caching off,
+    coalescing stays on.
+    """
+
+    def __init__(self, client: VKClient, cache_size: int = 1024, cache_ttl: float = 60.0):
+        self.client = client
+        self.cache: Optional[TTLCache] = TTLCache(cache_size, cache_ttl) if cache_size else None
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        for name, section in _SECTIONS.items():
+            setattr(self, name, section(self))
+
+    async def call(self, spec: MethodSpec, params: Dict[str, Any], priority: int) -> VKResponse:
+        if not spec.cached:
+            return await self.client._make_request(spec.name, params, priority)
+
+        key = (spec.name, tuple(sorted(params.items())))
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.create_task(self._fetch(spec, params, priority, key))
+        # A cancelled caller must not cancel the request other callers wait for
+        return await asyncio.shield(task)
+
+    async def _fetch(self, spec: MethodSpec, params: Dict[str, Any], priority: int, key: Hashable) -> VKResponse:
+        try:
+            response = await self.client._make_request(spec.name, params, priority)
+        finally:
+            del self._in_flight[key]
+        if response.ok and self.cache is not None:
+            self.cache.set(key, response)
+        return response
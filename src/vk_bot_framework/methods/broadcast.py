@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import aiohttp
+
+from ..client import Priority, VKClient
+from .methods import MessagesMethods
+
+
+class BroadcastResult(NamedTuple):
+    peer_id: int
+    message_id: Optional[int] = None
+    error: Optional[Dict[str, Any]] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Broadcast:
+    """Sends one message to many peers with ``messages.send`` ``peer_ids``.
+
+    Recipients are split into chunks of ``chunk_size`` (VK accepts up to
+    100), ``concurrency`` chunks are sent at a time at ``BULK`` priority, so
+    replies to users go first under the client's rate limit. Every chunk has
+    a ``random_id`` derived from ``broadcast_id`` and its index, so sending it
+    again, on a retry or after a resume, is dropped by VK as a duplicate.
+
+    Iterate over the broadcast to run it and get a ``BroadcastResult`` per
+    recipient as chunks finish. With ``checkpoint`` set, finished chunks are
+    recorded in that file and skipped when the same broadcast is run again
+    after an interruption; failed chunks are not recorded, so they are retried.
+    A checkpoint made for other recipients or another message is rejected
+    with ``ValueError``.
+    """
+
+    MAX_PEERS = 100
+
+    def __init__(
+            self,
+            client: VKClient,
+            peer_ids: Sequence[int],
+            message: str,
+            attachment: Optional[str] = None,
+            keyboard: Optional[str] = None,
+            broadcast_id: Optional[str] = None,
+            checkpoint: Optional[str] = None,
+            chunk_size: int = MAX_PEERS,
+            concurrency: int = 4,
+            retries: int = 3,
+            retry_backoff: float = 1.0
+    ):
+        if not 1 <= chunk_size <= self.MAX_PEERS:
+            raise ValueError(f"chunk_size must be between 1 and {self.MAX_PEERS}")
+        self.methods = MessagesMethods(client)
+        self.peer_ids = list(peer_ids)
+        self.message = message
+        self.attachment = attachment
+        self.keyboard = keyboard
+        self.checkpoint = checkpoint
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+        self._done: Set[int] = set()
+        state = self._load_checkpoint()
+        if state is not None:
+            if state["chunk_size"] != chunk_size or state.get("digest") != self._digest():
+                raise ValueError(f"Checkpoint {checkpoint} belongs to a different broadcast")
+            broadcast_id = state["broadcast_id"]
+            self._done = set(state["done"])
+        self.broadcast_id = broadcast_id or uuid.uuid4().hex
+
+    @property
+    def chunks(self) -> int:
+        return -(-len(self.peer_ids) // self.chunk_size)
+
+    @property
+    def remaining(self) -> int:
+        """Chunks not sent successfully yet."""
+        return self.chunks - len(self._done)
+
+    def random_id(self, index: int) -> int:
+        digest = hashlib.blake2b(f"{self.broadcast_id}:{index}".encode(), digest_size=4).digest()
+        # A positive int32, 0 would disable deduplication
+        return int.from_bytes(digest, "big") & 0x7FFFFFFF or 1
+
+    def _digest(self) -> str:
+        # Recipients and content, a checkpoint of another broadcast must not be resumed
+        content = json.dumps([self.peer_ids, self.message, self.attachment, self.keyboard])
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint, encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_checkpoint(self) -> None:
+        state = {
+            "broadcast_id": self.broadcast_id,
+            "chunk_size": self.chunk_size,
+            "recipients": len(self.peer_ids),
+            "digest": self._digest(),
+            "done": sorted(self._done)
+        }
+        # Replace in one step, an interrupted write must not lose the previous state
+        temporary = f"{self.checkpoint}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temporary, self.checkpoint)
+
+    async def _send_chunk(self, index: int) -> Tuple[int, bool, List[BroadcastResult]]:
+        peer_ids = self.peer_ids[index * self.chunk_size:(index + 1) * self.chunk_size]
+        attempt = 0
+        while True:
+            try:
+                response = await self.methods.send_many(
+                    peer_ids,
+                    self.message,
+                    self.random_id(index),
+                    attachment=self.attachment,
+                    keyboard=self.keyboard,
+                    priority=Priority.BULK
+                )
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    error = {"error_code": 0, "error_msg": f"{type(e).__name__}: {e}"}
+                    return index, False, [BroadcastResult(peer_id, error=error) for peer_id in peer_ids]
+                # Same random_id, so a send that went through before the error is not repeated
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                attempt += 1
+
+        if not response.ok:
+            return index, False, [BroadcastResult(peer_id, error=response.error) for peer_id in peer_ids]
+
+        items = {item.get("peer_id"): item for item in response.response or []}
+        results = []
+        for peer_id in peer_ids:
+            item = items.get(peer_id)
+            if item is None:
+                results.append(BroadcastResult(peer_id, error={"error_code": 0, "error_msg": "Missing in response"}))
+            elif "error" in item:
+                results.append(BroadcastResult(peer_id, error=item["error"]))
+            else:
+                results.append(BroadcastResult(peer_id, message_id=item.get("message_id")))
+        return index, True, results
+
+    async def __aiter__(self) -> AsyncIterator[BroadcastResult]:
+        pending_chunks = iter([index for index in range(self.chunks) if index not in self._done])
+        running: Set[asyncio.Task] = set()
+        try:
+            while True:
+                while len(running) < self.concurrency:
+                    index = next(pending_chunks, None)
+                    if index is None:
+                        break
+                    running.add(asyncio.create_task(self._send_chunk(index)))
+                if not running:
+                    break
+
+                finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    index, sent, results = task.result()
+                    if sent:
+                        self._done.add(index)
+                        if self.checkpoint is not None:
+                            self._save_checkpoint()
+                    for result in results:
+                        yield result
+        finally:
+            # Stopped early: chunks in flight are not recorded and are resent (deduplicated) on resume
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def run(self) -> List[BroadcastResult]:
+        """Send to every remaining recipient and return all results at once."""
+        return [result async for result in self]
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Iterable, Optional
 
-from ..client import VKClient
+from ..client import Priority, VKClient
 from ..types import VKResponse
 
 
@@ -13,16 +13,44 @@ class MessagesMethods:
             peer_id: int,
             message: str,
             attachment: Optional[str] = None,
-            keyboard: str = None
+            keyboard: str = None,
+            priority: int = Priority.INTERACTIVE,
+            random_id: int = 0
     ) -> VKResponse:
         params = {
             "peer_id": peer_id,
             "message": message,
-            "random_id": 0
+            "random_id": random_id
         }
         if attachment:
             params["attachment"] = attachment
         if keyboard:
             params["keyboard"] = keyboard
 
-        return await self.client._make_request("messages.send", params)
+        return await self.client._make_request("messages.send", params, priority)
+
+    async def send_many(
+            self,
+            peer_ids: Iterable[int],
+            message: str,
+            random_id: int,
+            attachment: Optional[str] = None,
+            keyboard: str = None,
+            priority: int = Priority.BULK
+    ) -> VKResponse:
+        """Send one message to up to 100 peers, the response lists the result of every peer.
+
+        VK drops a repeated send with the same ``random_id``, so retrying with
+        it does not deliver the message twice.
+        """
+        params = {
+            "peer_ids": ",".join(str(peer_id) for peer_id in peer_ids),
+            "message": message,
+            "random_id": random_id
+        }
+        if attachment:
+            params["attachment"] = attachment
+        if keyboard:
+            params["keyboard"] = keyboard
+
+        return await self.client._make_request("messages.send", params, priority)
@@ -0,0 +1,126 @@
+"""Description of the supported VK API methods, ``VKAPI`` is generated from it.
+
+Adding a method is adding a ``MethodSpec`` here. Parameter types pick the
+serializer: lists are sent comma separated, bools as 1/0 and ``dict``
+values (keyboards, templates) as JSON.
+"""
+from typing import Any, Dict, List, NamedTuple, Tuple, Type
+
+from ..client import Priority
+
+
+class ParamSpec(NamedTuple):
+    name: str
+    type: Any = str
+    required: bool = False
+    default: Any = None
+
+
+class MethodSpec(NamedTuple):
+    name: str
+    params: Tuple[ParamSpec, ...]
+    doc: str = ""
+    # Idempotent reads, their responses may be cached and identical calls coalesced
+    cached: bool = False
+    priority: int = Priority.NORMAL
+
+
+def _p(name: str, type_: Type = str, required: bool = False, default: Any = None) -> ParamSpec:
+    return ParamSpec(name, type_, required, default)
+
+
+Ids = List[int]
+Names = List[str]
+
+METHODS: Tuple[MethodSpec, ...] = (
+    MethodSpec("messages.send", (
+        _p("peer_id", int), _p("peer_ids", Ids), _p("user_id", int), _p("domain"), _p("chat_id", int),
+        _p("random_id", int, default=0), _p("message"), _p("lat", float), _p("long", float),
+        _p("attachment"), _p("reply_to", int), _p("forward_messages", Ids), _p("forward", dict),
+        _p("sticker_id", int), _p("keyboard", dict), _p("template", dict), _p("payload", dict),
+        _p("content_source", dict), _p("dont_parse_links", bool), _p("disable_mentions", bool),
+        _p("intent"),
+    ), "Send a message.", priority=Priority.INTERACTIVE),
+    MethodSpec("messages.edit", (
+        _p("peer_id", int, True), _p("message"), _p("message_id", int), _p("conversation_message_id", int),
+        _p("attachment"), _p("keyboard", dict), _p("template", dict), _p("keep_forward_messages", bool),
+        _p("keep_snippets", bool), _p("dont_parse_links", bool), _p("disable_mentions", bool),
+    ), "Edit a sent message.", priority=Priority.INTERACTIVE),
+    MethodSpec("messages.delete", (
+        _p("message_ids", Ids), _p("cmids", Ids), _p("peer_id", int), _p("delete_for_all", bool),
+        _p("spam", bool),
+    ), "Delete messages."),
+    MethodSpec("messages.getById", (
+        _p("message_ids", Ids, True), _p("preview_length", int), _p("extended", bool),
+        _p("fields", Names), _p("group_id", int),
+    ), "Get messages by their ids."),
+    MethodSpec("messages.getByConversationMessageId", (
+        _p("peer_id", int, True), _p("conversation_message_ids", Ids, True), _p("extended", bool),
+        _p("fields", Names), _p("group_id", int),
+    ), "Get messages by their ids within a conversation."),
+    MethodSpec("messages.getHistory", (
+        _p("peer_id", int), _p("offset", int), _p("count", int), _p("start_message_id", int),
+        _p("rev", bool), _p("extended", bool), _p("fields", Names), _p("group_id", int),
+    ), "Get the message history of a conversation."),
+    MethodSpec("messages.getConversations", (
+        _p("offset", int), _p("count", int), _p("filter"), _p("extended", bool),
+        _p("start_message_id", int), _p("fields", Names), _p("group_id", int),
+    ), "Get the conversations of the community."),
+    MethodSpec("messages.getConversationsById", (
+        _p("peer_ids", Ids, True), _p("extended", bool), _p("fields", Names), _p("group_id", int),
+    ), "Get conversations by peer ids.", cached=True),
+    MethodSpec("messages.getConversationMembers", (
+        _p("peer_id", int, True), _p("offset", int), _p("count", int), _p("extended", bool),
+        _p("fields", Names), _p("group_id", int),
+    ), "Get the members of a chat.", cached=True),
+    MethodSpec("messages.sendMessageEventAnswer", (
+        _p("event_id", str, True), _p("user_id", int, True), _p("peer_id", int, True),
+        _p("event_data", dict),
+    ), "Answer a callback button press.", priority=Priority.INTERACTIVE),
+    MethodSpec("messages.setActivity", (
+        _p("peer_id", int), _p("user_id", int), _p("type"), _p("group_id", int),
+    ), "Show the typing indicator.", priority=Priority.INTERACTIVE),
+    MethodSpec("messages.markAsRead", (
+        _p("peer_id", int), _p("start_message_id", int), _p("mark_conversation_as_read", bool),
+        _p("group_id", int),
+    ), "Mark messages as read."),
+    MethodSpec("users.get", (
+        _p("user_ids", Names), _p("fields", Names), _p("name_case"),
+    ), "Get user profiles.", cached=True),
+    MethodSpec("groups.getById", (
+        _p("group_ids", Names), _p("group_id"), _p("fields", Names),
+    ), "Get community info.", cached=True),
+    MethodSpec("groups.getMembers", (
+        _p("group_id"), _p("sort"), _p("offset", int), _p("count", int), _p("fields", Names),
+        _p("filter"),
+    ), "Get community members."),
+    MethodSpec("groups.isMember", (
+        _p("group_id", str, True), _p("user_id", int), _p("user_ids", Ids), _p("extended", bool),
+    ), "Check whether users are members of a community."),
+    MethodSpec("groups.getLongPollServer", (
+        _p("group_id", int, True),
+    ), "Get the Bots Long Poll server."),
+    MethodSpec("photos.getMessagesUploadServer", (
+        _p("peer_id", int),
+    ), "Get the upload URL for photos sent in messages."),
+    MethodSpec("photos.saveMessagesPhoto", (
+        _p("photo", str, True), _p("server", int), _p("hash"),
+    ), "Save a photo uploaded for a message."),
+    MethodSpec("docs.getMessagesUploadServer", (
+        _p("type"), _p("peer_id", int),
+    ), "Get the upload URL for documents and voice messages sent in messages."),
+    MethodSpec("docs.save", (
+        _p("file", str, True), _p("title"), _p("tags"), _p("return_tags", bool),
+    ), "Save an uploaded document."),
+    MethodSpec("utils.resolveScreenName", (
+        _p("screen_name", str, True),
+    ), "Resolve a short name to a user, community or application.", cached=True),
+)
+
+
+def by_section() -> Dict[str, List[MethodSpec]]:
+    sections: Dict[str, List[MethodSpec]] = {}
+    for spec in METHODS:
+        sections.setdefault(spec.name.split(".", 1)[0], []).append(spec)
+    return sections
+
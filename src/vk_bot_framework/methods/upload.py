@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, AsyncIterable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import aiohttp
+
+from ..client import VKClient
+from ..types import VKResponse
+from ..utils.lru import TTLCache
+from .api import VKAPI
+
+Source = Union[str, "os.PathLike[str]", bytes, AsyncIterable[bytes]]
+
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _hashing(source: AsyncIterable[bytes], digest: Any) -> AsyncIterable[bytes]:
+    async for chunk in source:
+        digest.update(chunk)
+        yield chunk
+
+
+def _check(response: VKResponse, method: str) -> Any:
+    if not response.ok:
+        raise UploadError(f"{method} failed: {response.error}")
+    return response.response
+
+
+class Uploader:
+    """Uploads photos and documents for messages and returns attachment strings.
+
+    Files are streamed from disk (or from an async iterator of ``bytes``)
+    into the multipart request, never read into memory as a whole. At most
+    ``concurrency`` uploads run at a time. Attachments are cached by the
+    SHA-256 of the content, so sending the same file again, or uploading it
+    twice at once, makes one upload. Content from an async iterator can't
+    be hashed before it is sent, it is uploaded and cached for later calls.
+    """
+
+    def __init__(
+            self,
+            client: VKClient,
+            concurrency: int = 4,
+            cache_size: int = 1024,
+            cache_ttl: Optional[float] = None
+    ):
+        self.client = client
+        self.api = VKAPI(client, cache_size=0)
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def upload_photo(self, source: Source, peer_id: int = 0, filename: str = "photo.jpg") -> str:
+        return await self._upload("photo", source, peer_id, filename, None)
+
+    async def upload_document(
+            self,
+            source: Source,
+            peer_id: int,
+            filename: str = "file",
+            title: Optional[str] = None,
+            doc_type: str = "doc"
+    ) -> str:
+        """Upload a document (``doc_type="doc"``) or a voice message (``"audio_message"``)."""
+        return await self._upload(doc_type, source, peer_id, filename, title)
+
+    async def upload_many(self, kind: str, sources: Iterable[Source], peer_id: int = 0) -> List[str]:
+        """Upload photos (``kind="photo"``) or documents in parallel, attachments keep the order of ``sources``."""
+        if kind == "photo":
+            return await asyncio.gather(*(self.upload_photo(source, peer_id) for source in sources))
+        return await asyncio.gather(*(
+            self.upload_document(source, peer_id, doc_type=kind) for source in sources
+        ))
+
+    async def _content_key(self, kind: str, source: Source) -> Optional[Tuple[str, str]]:
+        if isinstance(source, bytes):
+            return kind, hashlib.sha256(source).hexdigest()
+        if isinstance(source, (str, os.PathLike)):
+            digest = await asyncio.get_running_loop().run_in_executor(None, _hash_file, os.fspath(source))
+            return kind, digest
+        return None
+
+    async def _upload(self, kind: str, source: Source, peer_id: int, filename: str, title: Optional[str]) -> str:
+        key = await self._content_key(kind, source)
+        if key is None:
+            # Hashed while it streams, so the next upload of the same content is a cache hit
+            digest = hashlib.sha256()
+            attachment = await self._send(kind, _hashing(source, digest), peer_id, filename, title)
+            self.cache.set((kind, digest.hexdigest()), attachment)
+            return attachment
+
+        attachment = self.cache.get(key)
+        if attachment is not None:
+            return attachment
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.create_task(self._send(kind, source, peer_id, filename, title))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        attachment = await asyncio.shield(task)
+        self.cache.set(key, attachment)
+        return attachment
+
+    async def _send(self, kind: str, source: Source, peer_id: int, filename: str, title: Optional[str]) -> str:
+        async with self._semaphore:
+            if kind == "photo":
+                server = _check(await self.api.photos.get_messages_upload_server(peer_id=peer_id),
+                                "photos.getMessagesUploadServer")
+                uploaded = await self._post(server["upload_url"], "photo", source, filename)
+                if uploaded.get("photo") in (None, "", "[]"):
+                    raise UploadError("Upload server did not accept the photo")
+                saved = _check(await self.api.photos.save_messages_photo(
+                    photo=uploaded["photo"], server=uploaded["server"], hash=uploaded["hash"]
+                ), "photos.saveMessagesPhoto")
+                photo = saved[0]
+                attachment = f"photo{photo['owner_id']}_{photo['id']}"
+                return f"{attachment}_{photo['access_key']}" if photo.get("access_key") else attachment
+
+            server = _check(await self.api.docs.get_messages_upload_server(type=kind, peer_id=peer_id),
+                            "docs.getMessagesUploadServer")
+            uploaded = await self._post(server["upload_url"], "file", source, filename)
+            saved = _check(await self.api.docs.save(file=uploaded["file"], title=title), "docs.save")
+            doc = saved[saved["type"]]
+            return f"doc{doc['owner_id']}_{doc['id']}"
+
+    async def _post(self, url: str, field: str, source: Source, filename: str) -> Dict[str, Any]:
+        form = aiohttp.FormData()
+        file = None
+        try:
+            if isinstance(source, (str, os.PathLike)):
+                file = open(source, "rb")
+                form.add_field(field, file, filename=os.path.basename(os.fspath(source)) or filename)
+            else:
+                # bytes are sent as they are, async iterators chunk by chunk
+                form.add_field(field, source, filename=filename)
+            async with self.client.session.post(url, data=form) as response:
+                result = self.client.json_loads(await response.read())
+        finally:
+            if file is not None:
+                file.close()
+
+        if "error" in result:
+            raise UploadError(f"Upload to {url} failed: {result['error']}")
+        return result
@@ -0,0 +1,204 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram:
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # One slot per bucket plus +Inf
+            series = self._series[labels] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series.counts) if series is not None else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, series.counts):
+                cumulative += count
+                label_str = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Latency and throughput instruments of the bot, exposed in Prometheus format.
+
+    Recording is a dict lookup and a few additions, cheap enough to leave on.
+    Pass one instance to ``Dispatcher`` (it is shared with its client) and
+    serve it with ``start_server``.
+    """
+
+    def __init__(self, namespace: str = "vkbot"):
+        self.namespace = namespace
+        self.longpoll_duration = Histogram(
+            f"{namespace}_longpoll_request_seconds", "Round trip of long-poll requests"
+        )
+        self.queue_wait = Histogram(
+            f"{namespace}_update_queue_wait_seconds", "Time updates wait in the queue before processing"
+        )
+        self.handler_duration = Histogram(
+            f"{namespace}_handler_seconds", "Handler run time", ("handler",)
+        )
+        self.middleware_duration = Histogram(
+            f"{namespace}_middleware_seconds", "Middleware run time, including the rest of the chain", ("middleware",)
+        )
+        self.api_duration = Histogram(
+            f"{namespace}_api_request_seconds", "VK API request latency", ("method",)
+        )
+        self.executor_wait = Histogram(
+            f"{namespace}_executor_queue_wait_seconds", "Time handlers wait for a free pool worker", ("pool",)
+        )
+        self.executor_pending = Gauge(
+            f"{namespace}_executor_pending_tasks", "Handlers submitted to a pool and not finished yet", ("pool",)
+        )
+        self.updates = Counter(f"{namespace}_updates_total", "Received updates", ("type",))
+        self.unmatched_updates = Counter(
+            f"{namespace}_unmatched_updates_total", "Updates no handler matched", ("type",)
+        )
+        self.api_errors = Counter(f"{namespace}_api_errors_total", "VK API errors", ("method", "code"))
+        self.longpoll_failures = Counter(
+            f"{namespace}_longpoll_failures_total", "Long-poll failed responses recovered from", ("failed",)
+        )
+        self._instruments: List[object] = [
+            self.longpoll_duration,
+            self.queue_wait,
+            self.handler_duration,
+            self.middleware_duration,
+            self.api_duration,
+            self.executor_wait,
+            self.executor_pending,
+            self.updates,
+            self.unmatched_updates,
+            self.api_errors,
+            self.longpoll_failures,
+        ]
+
+    def register(self, instrument) -> None:
+        """Add a custom Counter, Gauge or Histogram to the exposition."""
+        self._instruments.append(instrument)
+
+    def render(self) -> str:
+        lines = []
+        for instrument in self._instruments:
+            lines.extend(instrument.render())
+        return "\n".join(lines) + "\n"
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    def get_app(self, path: str = "/metrics") -> web.Application:
+        app = web.Application()
+        app.router.add_get(path, self._handle_metrics)
+        return app
+
+    async def start_server(self, host: str = "127.0.0.1", port: int = 9090, path: str = "/metrics") -> web.AppRunner:
+        """Serve the metrics over HTTP, call ``cleanup()`` on the returned runner to stop.
+
+        Only local by default, pass e.g. ``host="0.0.0.0"`` for a scraper on another host.
+        """
+        runner = web.AppRunner(self.get_app(path))
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
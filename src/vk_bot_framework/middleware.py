@@ -1,9 +1,28 @@
-from typing import List, Any, Dict
+import time
+from functools import partial
+from typing import List, Any, Dict, Callable, Awaitable, Iterable, Optional
 
+from .metrics import Metrics
 from .types import VKUpdate
 
+Handler = Callable[[VKUpdate, Dict[str, Any]], Awaitable[Any]]
+
 
 class BaseMiddleware:
+    """Middleware wrapping the rest of the chain.
+
+    Override ``__call__`` to run code around ``handler`` (timing, locks, error
+    handling), or the simpler ``before_update``/``after_update`` hooks.
+    Returning False from ``before_update`` stops the update at this middleware.
+    """
+
+    async def __call__(self, handler: Handler, update: VKUpdate, data: Dict[str, Any]) -> Any:
+        if not await self.before_update(update, data):
+            return None
+        result = await handler(update, data)
+        await self.after_update(update, data)
+        return result
+
     async def before_update(self, update: VKUpdate, data: Dict[str, Any]) -> bool:
         return True
 
@@ -11,9 +30,51 @@ class BaseMiddleware:
         pass
 
 
+def is_noop(middleware: BaseMiddleware) -> bool:
+    cls = type(middleware)
+    return (
+        cls.__call__ is BaseMiddleware.__call__
+        and cls.before_update is BaseMiddleware.before_update
+        and cls.after_update is BaseMiddleware.after_update
+    )
+
+
+async def _timed(
+        metrics: Metrics,
+        name: str,
+        middleware: BaseMiddleware,
+        handler: Handler,
+        update: VKUpdate,
+        data: Dict[str, Any]
+) -> Any:
+    started = time.perf_counter()
+    try:
+        return await middleware(handler, update, data)
+    finally:
+        metrics.middleware_duration.observe(time.perf_counter() - started, name)
+
+
+def build_chain(
+        middlewares: Iterable[BaseMiddleware],
+        handler: Handler,
+        metrics: Optional[Metrics] = None
+) -> Handler:
+    """Wrap ``handler`` in ``middlewares``, the first one being the outermost.
+
+    Middlewares that override nothing are left out, so they cost nothing per update.
+    """
+    for middleware in reversed([m for m in middlewares if not is_noop(m)]):
+        if metrics is not None:
+            handler = partial(_timed, metrics, type(middleware).__name__, middleware, handler)
+        else:
+            handler = partial(middleware, handler)
+    return handler
+
+
 class MiddlewareManager:
     def __init__(self):
         self.middlewares: List[BaseMiddleware] = []
+        # Application-wide values, visible read-only from every update's context
         self.context_data: Dict[str, Any] = {}
 
     def setup(self, middleware: BaseMiddleware):
@@ -25,8 +86,10 @@ class MiddlewareManager:
     def get_context_value(self, key: str) -> Any:
         return self.context_data.get(key)
 
+    def build_chain(self, handler: Handler, metrics: Optional[Metrics] = None) -> Handler:
+        return build_chain(self.middlewares, handler, metrics)
+
     async def trigger_before_update(self, update: VKUpdate, data: Dict[str, Any]) -> bool:
-        data.update(self.context_data)
         for middleware in self.middlewares:
             if not await middleware.before_update(update, data):
                 return False
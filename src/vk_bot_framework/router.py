@@ -1,50 +1,107 @@
-from typing import List, Callable, Any, Optional, Dict
+import inspect
+from typing import List, Callable, Any, Optional, Dict, Tuple
 
+from .executors import EXECUTORS, is_async_callable
 from .filters import BaseFilter
 from .fsm import FSMContext
+from .handler_table import HandlerTable
+from .middleware import BaseMiddleware, MiddlewareManager
 from .types import VKUpdate
 
 
+class CallbackInjector:
+    """Knows which context values a handler accepts as keyword arguments.
+
+    The signature is inspected once at registration, so decorated callbacks
+    (through ``__wrapped__``) and ``functools.partial`` objects are supported.
+    The first three positional parameters receive ``update``, ``context`` and ``fsm``.
+    """
+
+    __slots__ = ("names", "var_keyword", "reserved")
+
+    POSITIONAL_ARGS = 3
+
+    def __init__(self, callback: Callable):
+        self.names: Tuple[str, ...] = ()
+        self.var_keyword = False
+        self.reserved: frozenset = frozenset()
+
+        try:
+            signature = inspect.signature(callback)
+        except (TypeError, ValueError):
+            return
+
+        names = []
+        reserved = []
+        positional_left = self.POSITIONAL_ARGS
+        for param in signature.parameters.values():
+            if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD) and positional_left:
+                positional_left -= 1
+                reserved.append(param.name)
+            elif param.kind == param.VAR_POSITIONAL:
+                positional_left = 0
+            elif param.kind == param.VAR_KEYWORD:
+                self.var_keyword = True
+            elif param.kind != param.POSITIONAL_ONLY:
+                names.append(param.name)
+
+        self.names = tuple(names)
+        self.reserved = frozenset(reserved)
+
+    def __call__(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        if self.var_keyword:
+            return {key: value for key, value in context.items() if key not in self.reserved}
+        return {name: context[name] for name in self.names if name in context}
+
+
 class Router:
     def __init__(self, name: Optional[str] = None):
         self.name = name or self.__class__.__name__
         self.handlers: List[Dict[str, Any]] = []
+        # Router-level middlewares wrap the handlers of this router once one matched
+        self.middleware_manager = MiddlewareManager()
+        self._table: Optional[HandlerTable] = None
+
+    def message(
+            self,
+            *filters: BaseFilter,
+            state: Optional[Any] = None,
+            middlewares: Optional[List[BaseMiddleware]] = None,
+            executor: Optional[str] = None
+    ):
+        """Register a message handler.
+
+        ``executor="thread"`` or ``"process"`` runs it in the dispatcher's
+        pools instead of the event loop, plain ``def`` handlers go to the
+        thread pool by default. ``async def`` handlers (also behind
+        decorators) stay on the loop unless given an executor, in which case
+        they can't use loop-bound values such as ``client`` or ``profiles``.
+        """
+        if executor is not None and executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}, got {executor!r}")
 
-    def message(self, *filters: BaseFilter, state: Optional[Any] = None):
         def decorator(callback: Callable):
             handler = {
                 "callback": callback,
+                "injector": CallbackInjector(callback),
                 "filters": list(filters),
                 "event_type": "message_new",
-                "state": state
+                "state": state,
+                "router": self,
+                "middlewares": list(middlewares or []),
+                "executor": executor or (None if is_async_callable(callback) else "thread")
             }
             self.handlers.append(handler)
+            self._table = None
             return callback
 
         return decorator
 
+    @property
+    def table(self) -> HandlerTable:
+        if self._table is None:
+            self._table = HandlerTable(self.handlers)
+        return self._table
+
     async def process_update(self, update: VKUpdate, context: dict, fsm: FSMContext) -> bool:
-        for handler in self.handlers:
-            if handler["event_type"] != update.type:
-                continue
-
-            # Apply filters
-            should_handle = True
-            for filter_obj in handler["filters"]:
-                if not await filter_obj.check(update, context):
-                    should_handle = False
-                    break
-
-            # Check state if specified
-            if handler["state"] is not None:
-                current_state = await fsm.get_state()
-                if str(handler["state"]) != current_state:
-                    should_handle = False
-
-            if should_handle:
-                # Dynamically pass only the relevant kwargs (like user_id if available)
-                handler_kwargs = {key: value for key, value in context.items() if
-                                  key in handler["callback"].__code__.co_varnames}
-                await handler["callback"](update, context, fsm, **handler_kwargs)
-                return True
-        return False
+        return await self.table.dispatch(update, context, fsm)
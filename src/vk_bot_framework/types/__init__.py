@@ -1,9 +1,10 @@
-from .vk_message import VKMessage
+from .vk_message import Command, VKMessage
 from .vk_response import VKResponse
 from .vk_update import VKUpdate
 
 
 __all__ = [
+    "Command",
     "VKMessage",
     "VKResponse",
     "VKUpdate",
@@ -1,13 +1,80 @@
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ..utils import codec
+
+_MISSING = object()
+
+
+class Command(NamedTuple):
+    prefix: str
+    name: str
+    args: str
 
 
-@dataclass
 class VKMessage:
-    message_id: int
-    peer_id: int
-    text: str
-    attachments: List[Dict[str, Any]]
-    from_id: int
-    timestamp: int
-    raw_data: Dict[str, Any]
+    """Typed view over a message object, fields are read from the raw dict on access."""
+
+    __slots__ = ("raw_data", "_payload", "_command")
+
+    def __init__(self, raw_data: Dict[str, Any]):
+        self.raw_data = raw_data
+        self._payload = _MISSING
+        self._command = _MISSING
+
+    def __repr__(self):
+        return f"VKMessage(peer_id={self.peer_id!r}, from_id={self.from_id!r}, text={self.text!r})"
+
+    @property
+    def message_id(self) -> int:
+        return self.raw_data.get("id", 0)
+
+    @property
+    def conversation_message_id(self) -> int:
+        return self.raw_data.get("conversation_message_id", 0)
+
+    @property
+    def peer_id(self) -> int:
+        return self.raw_data.get("peer_id", 0)
+
+    @property
+    def from_id(self) -> int:
+        return self.raw_data.get("from_id", 0)
+
+    @property
+    def text(self) -> str:
+        return self.raw_data.get("text") or ""
+
+    @property
+    def attachments(self) -> List[Dict[str, Any]]:
+        return self.raw_data.get("attachments") or []
+
+    @property
+    def timestamp(self) -> int:
+        return self.raw_data.get("date", 0)
+
+    @property
+    def payload(self) -> Optional[Any]:
+        """Decoded keyboard payload, parsed once."""
+        if self._payload is _MISSING:
+            raw = self.raw_data.get("payload")
+            try:
+                self._payload = codec.loads(raw) if raw else None
+            except ValueError:
+                self._payload = None
+        return self._payload
+
+    @property
+    def command(self) -> Optional[Command]:
+        """The text split into prefix, command name and arguments, parsed once.
+
+        Any text starting with a non-alphanumeric character counts, filters
+        decide which prefixes they accept.
+        """
+        if self._command is _MISSING:
+            self._command = None
+            text = self.text
+            if len(text) > 1 and not text[0].isalnum() and not text[0].isspace():
+                head, _, args = text.partition(" ")
+                if len(head) > 1:
+                    self._command = Command(head[0], head[1:], args.strip())
+        return self._command
@@ -1,21 +1,51 @@
-from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Any, Dict, Optional
+
+from .vk_message import VKMessage
+
+_MISSING = object()
+
+MESSAGE_OBJECT_TYPES = frozenset({"message_reply", "message_edit"})
 
 
-@dataclass
 class VKUpdate:
-    type: str
-    object: Dict[str, Any]
-    group_id: int
-    event_id: str
-    raw_update: Dict[str, Any]
+    """Lightweight view over a raw update, nothing is copied or parsed up front."""
+
+    __slots__ = ("raw_update", "_message")
+
+    def __init__(self, raw_update: Dict[str, Any]):
+        self.raw_update = raw_update
+        self._message = _MISSING
+
+    def __repr__(self):
+        return f"VKUpdate(type={self.type!r}, event_id={self.event_id!r})"
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'VKUpdate':
-        return cls(
-            type=data.get("type", ""),
-            object=data.get("object", {}),
-            group_id=data.get("group_id", 0),
-            event_id=data.get("event_id", ""),
-            raw_update=data
-        )
+        return cls(data)
+
+    @property
+    def type(self) -> str:
+        return self.raw_update.get("type", "")
+
+    @property
+    def object(self) -> Dict[str, Any]:
+        return self.raw_update.get("object", {})
+
+    @property
+    def group_id(self) -> int:
+        return self.raw_update.get("group_id", 0)
+
+    @property
+    def event_id(self) -> str:
+        return self.raw_update.get("event_id", "")
+
+    @property
+    def message(self) -> Optional[VKMessage]:
+        """The message of ``message_new``/``message_reply``/``message_edit`` updates."""
+        if self._message is _MISSING:
+            obj = self.object
+            raw = obj.get("message")
+            if raw is None and self.type in MESSAGE_OBJECT_TYPES:
+                raw = obj
+            self._message = VKMessage(raw) if isinstance(raw, dict) else None
+        return self._message
@@ -1,5 +1,8 @@
-from .keyboard_builder import KeyboardBuilder
+from .keyboard_builder import Keyboard, KeyboardBuilder, KeyboardError, KeyboardTemplate
 
 __all__ = [
+    "Keyboard",
     "KeyboardBuilder",
+    "KeyboardError",
+    "KeyboardTemplate",
 ]
@@ -1,14 +1,104 @@
-import json
-from typing import Dict, Any
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import codec
+
+COLORS = frozenset({"primary", "secondary", "negative", "positive"})
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+# Plain ASCII, so it comes out of one or two rounds of JSON encoding unchanged
+_MARKER = re.compile(r"@@kb([12])_(\w+)@@")
+
+
+class KeyboardError(ValueError):
+    pass
+
+
+class Keyboard(str):
+    """Serialized keyboard JSON, built once and passed as ``keyboard=`` as is."""
+
+    __slots__ = ()
+
+
+def _escape(value: Any, depth: int) -> str:
+    # JSON string contents, encoded once for labels and twice for payloads (a JSON string inside JSON)
+    text = str(value)
+    for _ in range(depth):
+        text = codec.dumps(text)[1:-1]
+    return text
+
+
+class KeyboardTemplate:
+    """A keyboard with ``{name}`` placeholders in labels and payload strings.
+
+    The keyboard is serialized once when the template is made; ``render``
+    only joins the pre-split JSON with the escaped values. Label lengths
+    are checked for the fixed text only.
+    """
+
+    __slots__ = ("_parts", "_slots", "names")
+
+    def __init__(self, serialized: str):
+        self._parts: List[str] = []
+        self._slots: List[Tuple[str, int]] = []
+        position = 0
+        for match in _MARKER.finditer(serialized):
+            self._parts.append(serialized[position:match.start()])
+            self._slots.append((match.group(2), int(match.group(1))))
+            position = match.end()
+        self._parts.append(serialized[position:])
+        self.names = frozenset(name for name, _ in self._slots)
+
+    def render(self, **values: Any) -> Keyboard:
+        missing = self.names - values.keys()
+        if missing:
+            raise KeyError(f"Missing keyboard template values: {', '.join(sorted(missing))}")
+        parts = self._parts
+        chunks = [parts[0]]
+        for index, (name, depth) in enumerate(self._slots, 1):
+            chunks.append(_escape(values[name], depth))
+            chunks.append(parts[index])
+        return Keyboard("".join(chunks))
 
 
 class KeyboardBuilder:
+    """Builds VK keyboards and checks VK's limits as buttons are added.
+
+    ``get_keyboard`` serializes once and returns the cached JSON until the
+    keyboard is changed. For keyboards sent again and again build them once,
+    at import time, with ``freeze`` (a ``Keyboard`` string) or ``template``
+    (when labels or payloads vary per message).
+    """
+
+    MAX_LABEL_LENGTH = 40
+    MAX_PAYLOAD_LENGTH = 255
+    # (rows, buttons per row, buttons in total)
+    LIMITS = {False: (10, 5, 40), True: (6, 5, 10)}
+    # These buttons take a whole row
+    WIDE_BUTTONS = frozenset({"location", "vkpay", "open_app"})
+
     def __init__(self, one_time: bool = False, inline: bool = False):
+        if one_time and inline:
+            raise KeyboardError("Inline keyboards can't be one-time")
         self.keyboard = {
             "one_time": one_time,
             "inline": inline,
             "buttons": []
         }
+        self._json: Optional[Keyboard] = None
+
+    @property
+    def buttons(self) -> List[List[Dict[str, Any]]]:
+        return self.keyboard["buttons"]
+
+    def add_row(self) -> "KeyboardBuilder":
+        """Start a new row, the following buttons without ``row`` go there."""
+        max_rows = self.LIMITS[self.keyboard["inline"]][0]
+        if len(self.buttons) >= max_rows:
+            raise KeyboardError(f"A keyboard can have at most {max_rows} rows")
+        self.buttons.append([])
+        self._json = None
+        return self
 
     def add_button(
             self,
@@ -16,26 +106,122 @@ class KeyboardBuilder:
             color: str = "primary",
             payload: Dict[str, Any] = None,
             row: int = None
-    ):
-        button = {
-            "action": {
-                "type": "text",
-                "label": text,
-            },
-            "color": color
-        }
+    ) -> "KeyboardBuilder":
+        return self._add({"type": "text", "label": text}, payload, color, row)
+
+    def add_callback_button(
+            self,
+            text: str,
+            payload: Dict[str, Any] = None,
+            color: str = "primary",
+            row: int = None
+    ) -> "KeyboardBuilder":
+        """A button that sends a ``message_event`` instead of a message."""
+        return self._add({"type": "callback", "label": text}, payload, color, row)
+
+    def add_link_button(
+            self,
+            text: str,
+            link: str,
+            payload: Dict[str, Any] = None,
+            row: int = None
+    ) -> "KeyboardBuilder":
+        return self._add({"type": "open_link", "link": link, "label": text}, payload, None, row)
+
+    def add_location_button(self, payload: Dict[str, Any] = None, row: int = None) -> "KeyboardBuilder":
+        return self._add({"type": "location"}, payload, None, row)
+
+    def _add(
+            self,
+            action: Dict[str, Any],
+            payload: Optional[Dict[str, Any]],
+            color: Optional[str],
+            row: Optional[int]
+    ) -> "KeyboardBuilder":
+        label = action.get("label")
+        if label is not None and len(label) > self.MAX_LABEL_LENGTH:
+            raise KeyboardError(f"Button label is longer than {self.MAX_LABEL_LENGTH} characters: {label!r}")
         if payload:
-            button["action"]["payload"] = json.dumps(payload)
+            if len(codec.dumps(payload)) > self.MAX_PAYLOAD_LENGTH:
+                raise KeyboardError(f"Button payload is longer than {self.MAX_PAYLOAD_LENGTH} characters")
+            # Kept as an object, it is serialized together with the keyboard
+            action["payload"] = payload
 
-        if row is not None and row >= len(self.keyboard["buttons"]):
-            self.keyboard["buttons"].extend([] for _ in range(row - len(self.keyboard["buttons"]) + 1))
+        button: Dict[str, Any] = {"action": action}
+        if color is not None:
+            if color not in COLORS:
+                raise KeyboardError(f"Unknown button color {color!r}")
+            button["color"] = color
 
+        buttons = self.buttons
         if row is not None:
-            self.keyboard["buttons"][row].append(button)
+            while row >= len(buttons):
+                self.add_row()
+            target = buttons[row]
         else:
-            if not self.keyboard["buttons"]:
-                self.keyboard["buttons"].append([])
-            self.keyboard["buttons"][-1].append(button)
+            if not buttons:
+                self.add_row()
+            target = buttons[-1]
+        self._check_row(target, action["type"])
+        self._check_total()
+
+        target.append(button)
+        self._json = None
+        return self
+
+    def _check_row(self, target: List[Dict[str, Any]], button_type: str) -> None:
+        per_row = self.LIMITS[self.keyboard["inline"]][1]
+        if target:
+            wide = button_type if button_type in self.WIDE_BUTTONS else target[0]["action"]["type"]
+            if wide in self.WIDE_BUTTONS:
+                raise KeyboardError(f"A {wide} button has to be alone in its row")
+        if len(target) >= per_row:
+            raise KeyboardError(f"A row can have at most {per_row} buttons")
+
+    def _check_total(self) -> None:
+        total = self.LIMITS[self.keyboard["inline"]][2]
+        if sum(len(row) for row in self.buttons) >= total:
+            raise KeyboardError(f"A keyboard can have at most {total} buttons")
+
+    def _serialize(self, template: bool = False) -> str:
+        rows = []
+        for row in self.buttons:
+            if not row:
+                continue
+            serialized_row = []
+            for button in row:
+                action = dict(button["action"])
+                payload = action.get("payload")
+                if template:
+                    if "label" in action:
+                        action["label"] = _PLACEHOLDER.sub(r"@@kb1_\1@@", action["label"])
+                    if payload is not None:
+                        payload = _mark_payload(payload)
+                if payload is not None:
+                    action["payload"] = codec.dumps(payload)
+                serialized_row.append({**button, "action": action})
+            rows.append(serialized_row)
+        return codec.dumps({**self.keyboard, "buttons": rows})
+
+    def get_keyboard(self) -> Keyboard:
+        if self._json is None:
+            self._json = Keyboard(self._serialize())
+        return self._json
+
+    def freeze(self) -> Keyboard:
+        """The keyboard JSON, later changes to the builder don't affect it."""
+        return self.get_keyboard()
+
+    def template(self) -> KeyboardTemplate:
+        """Compile the keyboard with ``{name}`` placeholders for ``render(name=...)``."""
+        return KeyboardTemplate(self._serialize(template=True))
+
 
-    def get_keyboard(self) -> str:
-        return json.dumps(self.keyboard)
+def _mark_payload(value: Any) -> Any:
+    if isinstance(value, str):
+        return _PLACEHOLDER.sub(r"@@kb2_\1@@", value)
+    if isinstance(value, dict):
+        return {key: _mark_payload(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_mark_payload(item) for item in value]
+    return value
@@ -0,0 +1,60 @@
+"""Run from the repository root: python -m pytest tests"""
+import asyncio
+
+from src.vk_bot_framework.fsm import MemoryStorage
+
+
+def _full_storage() -> MemoryStorage:
+    storage = MemoryStorage(max_size=2)
+
+    async def fill():
+        await storage.set_state(1, "a")
+        await storage.set_state(2, "b")
+
+    asyncio.run(fill())
+    return storage
+
+
+def test_clearing_unknown_chat_keeps_other_chats():
+    storage = _full_storage()
+
+    async def clear():
+        await storage.set_state(3, None)
+        await storage.set_data(3, {})
+
+    asyncio.run(clear())
+    assert asyncio.run(storage.get_state(1)) == "a"
+    assert asyncio.run(storage.get_state(2)) == "b"
+    assert storage.evictions == 0
+    assert storage.stats()["entries"] == 2
+
+
+def test_new_chat_evicts_least_recently_used():
+    storage = _full_storage()
+    asyncio.run(storage.set_state(3, "c"))
+    assert asyncio.run(storage.get_state(1)) is None
+    assert asyncio.run(storage.get_state(3)) == "c"
+    assert storage.evictions == 1
+
+
+def test_empty_update_of_unknown_chat_keeps_other_chats():
+    storage = _full_storage()
+
+    async def update():
+        assert await storage.update_data(3, {}) == {}
+        await storage.patch(3)
+
+    asyncio.run(update())
+    assert storage.evictions == 0
+    assert storage.stats()["entries"] == 2
+
+
+def test_patch_changes_only_given_fields():
+    storage = MemoryStorage()
+
+    async def run():
+        await storage.set_data(1, {"name": "Ann", "age": 20})
+        await storage.patch(1, age=21)
+        return await storage.get_data(1)
+
+    assert asyncio.run(run()) == {"name": "Ann", "age": 21}